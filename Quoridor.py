@@ -4,6 +4,450 @@
 # a game, two players take turns either moving their pawn on the board or placing fences to obstruct the
 # opponent. The object of the game is to reach the opponent's baseline (starting row) first.
 
+import cProfile
+import functools
+import heapq
+import itertools
+import random
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+MIN_SIZE = 3                      # smallest board, in tiles across
+MAX_SIZE = 255                    # largest board, so a distance always fits in 16 bits
+NO_PATH = 1 << 16                 # distance used for a pawn that has fenced itself in, longer than any path
+DISTANCE_CACHE_BYTES = 32 << 20   # default memory cap of the shared distance map cache
+CACHE_ENTRY_OVERHEAD = 160        # bytes a cache entry takes besides its map and fence bitmasks
+
+
+def build_neighbors(size):
+    """
+    Takes the width of the board in tiles, builds a table listing, for every tile,
+    the four neighboring tiles (in the order up, down, left, right) along with the
+    horizontal and vertical fence bits that block the step to each one. Steps off
+    the board are always blocked by the edges of the board
+    """
+    table = []
+    for tile in range(0, size * size):
+        x = tile % size
+        y = tile // size
+        table.append(((tile - size, 1 << tile, 0),                         # up
+                      (tile + size, 1 << tile + size, 0),                  # down
+                      (tile - 1, 0, 1 << y * (size + 1) + x),              # left
+                      (tile + 1, 0, 1 << y * (size + 1) + x + 1)))         # right
+    return table
+
+
+def build_fence_slots(size):
+    """
+    Takes the width of the board in tiles, builds a table of every fence slot inside
+    the board, each entry holding the direction, the (x, y) position, the horizontal
+    and vertical fence bits of the slot, and the two tiles on either side of it
+    """
+    slots = []
+    for y in range(1, size):
+        for x in range(0, size):
+            slots.append(('h', (x, y), 1 << y * size + x, 0) + fence_tiles('h', x, y, size))
+    for y in range(0, size):
+        for x in range(1, size):
+            slots.append(('v', (x, y), 0, 1 << y * (size + 1) + x) + fence_tiles('v', x, y, size))
+    return slots
+
+
+def fence_tiles(direction, x, y, size=9):
+    """
+    Takes direction, x, and y of a fence and the width of the board,
+    returns the two tiles on either side of it
+    """
+    if direction == 'h':
+        return (y - 1) * size + x, y * size + x
+    return y * size + x - 1, y * size + x
+
+
+def build_zobrist_keys(size=9, fences=10, seed=20210812):
+    """
+    Takes the width of the board and the fences each player starts with, builds the
+    random 64-bit keys used for Zobrist hashing: one per tile for each pawn, one per
+    fence bit (zero for the edges of the board, which never change), one per fence
+    count for each player, and one for player 2 to move
+    """
+    rng = random.Random(seed)
+    pawns = [[rng.getrandbits(64) for tile in range(0, size * size)] for player in range(0, 2)]
+    h_fences = [0 if y in (0, size) else rng.getrandbits(64) for y in range(0, size + 1) for x in range(0, size)]
+    v_fences = [0 if x in (0, size) else rng.getrandbits(64) for y in range(0, size) for x in range(0, size + 1)]
+    counts = [[rng.getrandbits(64) for count in range(0, fences + 1)] for player in range(0, 2)]
+    return pawns, h_fences, v_fences, counts, rng.getrandbits(64)
+
+
+class Board:
+    """
+    This represents the tables for one size of board and number of fences, built once
+    and shared by every game played with them: the neighbor and fence slot tables, the
+    edges of the board, the fence slot on the edge between every pair of neighboring
+    tiles, the (x, y) of every tile, the starting tiles, the Zobrist keys and the hash
+    of the starting position, and the scratch space for path searches (one per thread).
+    Distance maps are bytes objects when every distance fits in a byte and 16-bit
+    arrays on larger boards, with unreachable one more than any distance could be
+    """
+
+    __slots__ = ('size', 'fences', 'tiles', 'neighbors', 'fence_slots', 'edge_slots', 'h_border', 'v_border',
+                 'positions', 'start', 'pawn_keys', 'h_fence_keys', 'v_fence_keys', 'fence_count_keys',
+                 'turn_key', 'start_hash', 'unreachable', 'pack', 'scratch')
+
+    def __init__(self, size, fences):
+        """
+        Takes the width of the board in tiles and the fences each player starts with, builds the tables
+        """
+        self.size = size
+        self.fences = fences
+        self.tiles = size * size
+        self.neighbors = build_neighbors(size)
+        self.fence_slots = build_fence_slots(size)
+        self.edge_slots = {(slot[4], slot[5]): slot for slot in self.fence_slots}
+        self.edge_slots.update({(slot[5], slot[4]): slot for slot in self.fence_slots})
+        self.h_border = (1 << size) - 1 | (1 << size) - 1 << size * size
+        self.v_border = sum(1 << y * (size + 1) | 1 << y * (size + 1) + size for y in range(0, size))
+        self.positions = tuple((tile % size, tile // size) for tile in range(0, self.tiles))
+        self.start = (size // 2, self.tiles - size + size // 2)
+        (self.pawn_keys, self.h_fence_keys, self.v_fence_keys, self.fence_count_keys,
+         self.turn_key) = build_zobrist_keys(size, fences)
+        self.start_hash = (self.pawn_keys[0][self.start[0]] ^ self.pawn_keys[1][self.start[1]] ^
+                           self.fence_count_keys[0][fences] ^ self.fence_count_keys[1][fences])
+        if self.tiles < 255:
+            self.unreachable, self.pack = 255, bytes
+        else:
+            self.unreachable, self.pack = 65535, functools.partial(array, 'H')
+        self.scratch = Scratch(self.tiles)
+
+
+class Scratch(threading.local):
+    """
+    This represents the visited list and queue that path searches on one size of board
+    work in. It is a thread local, so every thread gets its own lists, made the first
+    time that thread searches, and games on different threads never share them
+    """
+
+    def __init__(self, tiles):
+        """
+        Takes the number of tiles, makes the lists for the thread using them
+        """
+        self.visited = [0] * tiles
+        self.queue = [0] * tiles
+
+
+@functools.lru_cache(maxsize=None)
+def board_for(size=9, fences=10):
+    """
+    Takes the width of the board in tiles and the fences each player starts with,
+    returns the shared Board for them, building it the first time. Raises
+    ValueError if the board is too small or too large, or fences is negative
+    """
+    if not MIN_SIZE <= size <= MAX_SIZE:
+        raise ValueError('board size must be from %d to %d' % (MIN_SIZE, MAX_SIZE))
+    if fences < 0:
+        raise ValueError('fences can not be negative')
+    return Board(size, fences)
+
+
+class DistanceCache:
+    """
+    This represents an LRU cache of distance maps shared by every game in the process,
+    keyed by board size, goal row, and the two fence bitmasks. The same fence layouts
+    come up over and over (the empty board, common openings, positions that only
+    differ by where the pawns are), and a map found here doesn't have to be built
+    or repaired. Entries are counted at the bytes they roughly take, and the least
+    recently used ones are dropped once the total goes over the memory cap. A lock
+    makes it safe to share between threads
+    """
+
+    __slots__ = ('_entries', '_limit', '_bytes', '_hits', '_misses', '_evictions', '_lock')
+
+    def __init__(self, limit=DISTANCE_CACHE_BYTES):
+        """
+        Takes the memory cap in bytes (0 turns the cache off), initializes an empty cache
+        """
+        self._entries = OrderedDict()
+        self._limit = limit
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """
+        Takes a key, (size, goal row, horizontal fences, vertical fences), returns
+        the cached distance map and marks it as just used, or None if it isn't cached
+        """
+        with self._lock:
+            distances = self._entries.get(key)
+            if distances is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return distances
+
+    def store(self, key, distances):
+        """
+        Takes a key and its distance map, caches the map, dropping the least
+        recently used entries until the cache is back under its memory cap
+        """
+        with self._lock:
+            if self._limit <= 0 or key in self._entries:
+                return
+            self._entries[key] = distances
+            self._bytes += entry_bytes(key, distances)
+            self.evict()
+
+    def set_limit(self, limit):
+        """
+        Takes a new memory cap in bytes, dropping least recently used entries to fit it
+        """
+        with self._lock:
+            self._limit = limit
+            self.evict()
+
+    def evict(self):
+        """
+        Drops least recently used entries until the cache is under its
+        memory cap. Called with the lock held
+        """
+        while self._entries and self._bytes > self._limit:
+            old_key, old_distances = self._entries.popitem(last=False)
+            self._bytes -= entry_bytes(old_key, old_distances)
+            self._evictions += 1
+
+    def clear(self):
+        """
+        Empties the cache and resets its statistics
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = self._hits = self._misses = self._evictions = 0
+
+    def get_stats(self):
+        """
+        Returns a dictionary of the hits, misses, evictions, hit rate, number
+        of entries, bytes they take, and the memory cap
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions,
+                    'hit_rate': self._hits / lookups if lookups else 0.0, 'entries': len(self._entries),
+                    'bytes': self._bytes, 'limit': self._limit}
+
+
+def entry_bytes(key, distances):
+    """
+    Takes a distance cache key and map, returns about how many bytes the entry takes
+    """
+    return sys.getsizeof(distances) + sys.getsizeof(key[2]) + sys.getsizeof(key[3]) + CACHE_ENTRY_OVERHEAD
+
+
+STANDARD = board_for(9, 10)                 # the usual 9x9 board with ten fences each
+NEIGHBORS = STANDARD.neighbors
+SIDES = ((2, 3), (2, 3), (0, 1), (0, 1))    # directions to either side of up, down, left, right
+UNREACHABLE = STANDARD.unreachable          # distance map entry for a tile fenced off from the goal
+POSITIONS = STANDARD.positions
+FENCE_SLOTS = STANDARD.fence_slots
+PAWN_KEYS, H_FENCE_KEYS, V_FENCE_KEYS = STANDARD.pawn_keys, STANDARD.h_fence_keys, STANDARD.v_fence_keys
+FENCE_COUNT_KEYS, TURN_KEY = STANDARD.fence_count_keys, STANDARD.turn_key
+H_BORDER = STANDARD.h_border                # top and bottom edges
+V_BORDER = STANDARD.v_border                # left and right edges
+START_HASH = STANDARD.start_hash
+GENERATIONS = itertools.count(1)            # stamps for the visited lists, so they never have to be cleared
+DISTANCE_CACHE = DistanceCache()            # distance maps shared by every game in the process
+
+
+def pawn_destinations(h_walls, v_walls, own, other, neighbors=NEIGHBORS):
+    """
+    Takes the fence bitmasks, the tiles of the moving pawn and the other pawn, and
+    the neighbor table, returns a list of every tile the moving pawn can go to. A
+    step onto the other pawn becomes a jump over it, or if a fence or the edge of
+    the board is behind it, a diagonal move to either side of it
+    """
+    destinations = []
+    for direction in range(0, 4):
+        neighbor, h_bit, v_bit = neighbors[own][direction]
+        if h_walls & h_bit or v_walls & v_bit:
+            continue
+        if neighbor != other:
+            destinations.append(neighbor)
+            continue
+        beyond, h_bit, v_bit = neighbors[other][direction]
+        if not (h_walls & h_bit or v_walls & v_bit):
+            destinations.append(beyond)
+            continue
+        for side in SIDES[direction]:
+            beside, h_bit, v_bit = neighbors[other][side]
+            if not (h_walls & h_bit or v_walls & v_bit):
+                destinations.append(beside)
+    return destinations
+
+
+def zobrist_hash(h_walls, v_walls, p1, p2, turn, p1_fences, p2_fences, board=STANDARD):
+    """
+    Takes the fence bitmasks, pawn tiles, whose turn it is, the fences each player
+    has left, and the Board, returns the Zobrist hash of that position from scratch
+    """
+    key = board.pawn_keys[0][p1] ^ board.pawn_keys[1][p2]
+    key ^= board.fence_count_keys[0][p1_fences] ^ board.fence_count_keys[1][p2_fences]
+    if turn == 2:
+        key ^= board.turn_key
+    for walls, keys in ((h_walls & ~board.h_border, board.h_fence_keys),
+                        (v_walls & ~board.v_border, board.v_fence_keys)):
+        while walls:                       # only the fences placed, lowest bit first
+            low = walls & -walls
+            key ^= keys[low.bit_length() - 1]
+            walls ^= low
+    return key
+
+
+def snapshot_fits(snapshot, board=STANDARD):
+    """
+    Takes a snapshot and a Board, returns True if the snapshot can be a position on
+    that board: both fence bitmasks have the board's edges set and no bit past
+    them, the pawns are on its tiles, and the turn, fences left, and winner are in range
+    """
+    h_walls, v_walls, p1, p2, turn, p1_fences, p2_fences, winner = snapshot
+    edges = board.size * (board.size + 1)
+    if h_walls >> edges or v_walls >> edges:
+        return False
+    if h_walls & board.h_border != board.h_border or v_walls & board.v_border != board.v_border:
+        return False
+    return (0 <= p1 < board.tiles and 0 <= p2 < board.tiles and p1 != p2 and turn in (1, 2)
+            and 0 <= p1_fences <= board.fences and 0 <= p2_fences <= board.fences and winner in (0, 1, 2))
+
+
+def build_distances(h_walls, v_walls, goal, board=STANDARD):
+    """
+    Takes the fence bitmasks, a goal row, and the Board, returns a distance map holding
+    the number of steps from every tile to the closest tile on the goal row (ignoring
+    pawns), with the board's unreachable for tiles that are fenced off from it
+    """
+    neighbors = board.neighbors
+    unreachable = board.unreachable
+    distances = [unreachable] * board.tiles
+    queue = list(range(goal * board.size, goal * board.size + board.size))
+    for tile in queue:
+        distances[tile] = 0
+    head = 0
+    while head < len(queue):
+        tile = queue[head]
+        head += 1
+        for neighbor, h_bit, v_bit in neighbors[tile]:
+            if not (h_walls & h_bit or v_walls & v_bit) and distances[neighbor] == unreachable:
+                distances[neighbor] = distances[tile] + 1
+                queue.append(neighbor)
+    return board.pack(distances)
+
+
+def cached_distances(h_walls, v_walls, goal, board=STANDARD):
+    """
+    Takes the fence bitmasks, a goal row, and the Board, returns the distance
+    map from DISTANCE_CACHE, building it and caching it if it isn't there
+    """
+    key = (board.size, goal, h_walls, v_walls)
+    distances = DISTANCE_CACHE.lookup(key)
+    if distances is None:
+        distances = build_distances(h_walls, v_walls, goal, board)
+        DISTANCE_CACHE.store(key, distances)
+    return distances
+
+
+def repair_distances(distances, h_walls, v_walls, tile_a, tile_b, board=STANDARD):
+    """
+    Takes a distance map built before a fence went in between tile_a and tile_b,
+    the fence bitmasks with that fence added, and the Board, returns the updated
+    map. Only the tiles whose every shortest path crossed the fence are recomputed,
+    and the same map is returned if the fence didn't make any path longer
+    """
+    if distances[tile_a] == distances[tile_b] + 1:
+        affected = find_affected(distances, h_walls, v_walls, tile_a, board.neighbors)
+    elif distances[tile_b] == distances[tile_a] + 1:
+        affected = find_affected(distances, h_walls, v_walls, tile_b, board.neighbors)
+    else:
+        return distances
+    if not affected:
+        return distances
+    return relax_affected(distances, h_walls, v_walls, affected, board)
+
+
+def has_support(distances, h_walls, v_walls, tile, affected, neighbors=NEIGHBORS):
+    """
+    Takes a distance map, the fence bitmasks, a tile, the set of affected tiles,
+    and the neighbor table, returns True if the tile still has an open neighbor
+    one step closer to the goal that isn't affected
+    """
+    step = distances[tile] - 1
+    for neighbor, h_bit, v_bit in neighbors[tile]:
+        if not (h_walls & h_bit or v_walls & v_bit) and distances[neighbor] == step:
+            if neighbor not in affected:
+                return True
+    return False
+
+
+def find_affected(distances, h_walls, v_walls, child, neighbors=NEIGHBORS):
+    """
+    Takes a distance map, the fence bitmasks, the tile on the far side of a new fence,
+    and the neighbor table, returns the set of tiles left without a shortest path.
+    Walks outwards from child in order of distance, so a tile is only checked once
+    every tile one step closer to the goal has been settled
+    """
+    affected = set()
+    queue = [child]
+    head = 0
+    while head < len(queue):
+        tile = queue[head]
+        head += 1
+        if tile in affected or has_support(distances, h_walls, v_walls, tile, affected, neighbors):
+            continue
+        affected.add(tile)
+        for neighbor, h_bit, v_bit in neighbors[tile]:
+            if not (h_walls & h_bit or v_walls & v_bit) and distances[neighbor] == distances[tile] + 1:
+                queue.append(neighbor)
+    return affected
+
+
+def relax_affected(distances, h_walls, v_walls, affected, board=STANDARD):
+    """
+    Takes a distance map, the fence bitmasks, the affected tiles, and the Board,
+    returns a new map with the affected tiles given their new distances. Starts
+    from the unaffected tiles bordering them and works outwards in order of distance
+    """
+    neighbors = board.neighbors
+    new_distances = list(distances)
+    heap = []
+    for tile in affected:
+        new_distances[tile] = board.unreachable
+        for neighbor, h_bit, v_bit in neighbors[tile]:
+            if not (h_walls & h_bit or v_walls & v_bit) and neighbor not in affected:
+                heap.append((distances[neighbor] + 1, tile))
+    heapq.heapify(heap)
+    while heap:
+        step, tile = heapq.heappop(heap)
+        if step >= new_distances[tile]:
+            continue
+        new_distances[tile] = step
+        for neighbor, h_bit, v_bit in neighbors[tile]:
+            if not (h_walls & h_bit or v_walls & v_bit) and step + 1 < new_distances[neighbor]:
+                heapq.heappush(heap, (step + 1, neighbor))
+    return board.pack(new_distances)
+
+
+def changed_tiles(old, new):
+    """
+    Takes a distance map from before a fence went in (or None if it hadn't been
+    built) and the map after, returns the number of tiles whose distance changed
+    """
+    if old is None or old is new:
+        return 0
+    return sum(1 for before, after in zip(old, new) if before != after)
+
+
 class QuoridorGame:
     """
     This represents a QuoridorGame object which is used to play a game of quoridor with two players.
@@ -14,59 +458,85 @@ class QuoridorGame:
     in which case the move can jump over the opponent's pawn. If a jump is blocked by a fence (and other
     fences aren't obstructing the way), the pawn can move diagonally. Each player has ten fences to place,
     either vertically or horizontally. The game is won when a player's pawn reaches the opponent's baseline
-    (their pawn's starting row)
+    (their pawn's starting row). Other sizes of board and numbers of fences can be played too, with the
+    pawns starting in the middle of the first and last rows
     """
 
-    def __init__(self):
+    __slots__ = ('_board', '_h_walls', '_v_walls', '_p1_distances', '_p2_distances', '_turn', '_p1', '_p2',
+                 '_player', '_p1Fences', '_p2Fences', '_winner', '_undo', '_listener', '_stats',
+                 '_stats_hook', '_profiler', '_timing', '_nodes', '_hash')
+
+    def __init__(self, size=9, fences=10):
         """
-        Initializes a quoridor game with data members to initialize the board,
+        Takes an optional board size (tiles across) and number of fences for each
+        player, initializes a quoridor game with data members to initialize the board,
         keep track of whose turn it is, keep track of where on the board the player's
         pawns are, keep track of how many fences each player has left, and keep track
-        of if the game has been won
-        """
-        self._board = [['+==', '+==', '+==', '+==', '+==', '+==', '+==', '+==', '+==', '+'],
-                       ['|  ', '   ', '   ', '   ', ' P1', '   ', '   ', '   ', '   ', '|'],
-                       ['+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+'],
-                       ['|  ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '|'],
-                       ['+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+'],
-                       ['|  ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '|'],
-                       ['+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+'],
-                       ['|  ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '|'],
-                       ['+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+'],
-                       ['|  ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '|'],
-                       ['+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+'],
-                       ['|  ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '|'],
-                       ['+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+'],
-                       ['|  ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '|'],
-                       ['+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+'],
-                       ['|  ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '   ', '|'],
-                       ['+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+  ', '+'],
-                       ['|  ', '   ', '   ', '   ', ' P2', '   ', '   ', '   ', '   ', '|'],
-                       ['+==', '+==', '+==', '+==', '+==', '+==', '+==', '+==', '+==', '+']]
-        self._fair_play_board = [[False, False, False, False, False, False, False, False, False, ],
-                                [False, False, False, False, False, False, False, False, False, ],
-                                [False, False, False, False, False, False, False, False, False, ],
-                                [False, False, False, False, False, False, False, False, False, ],
-                                [False, False, False, False, False, False, False, False, False, ],
-                                [False, False, False, False, False, False, False, False, False, ],
-                                [False, False, False, False, False, False, False, False, False, ],
-                                [False, False, False, False, False, False, False, False, False, ],
-                                [False, False, False, False, False, False, False, False, False, ]]
-        self._fair_play_board1 = []      # used to check fair play rule
+        of if the game has been won. Fences are stored as two bitmasks: bit y * 9 + x
+        of the horizontal mask is the edge above tile (x, y) and bit y * 10 + x of the
+        vertical mask is the edge left of tile (x, y). The four edges of the board are
+        set from the start. Pawns are stored as tile numbers (y * 9 + x). Every data
+        member is a slot holding an int, a shared tuple or bytes object, or None until
+        it is needed, and path searches use scratch space shared by every game on the
+        same thread, so an idle game takes a few hundred bytes. On other sizes of board
+        9 becomes the size and 10 the size plus one. Raises ValueError for a board
+        smaller than MIN_SIZE or larger than MAX_SIZE
+        """
+        board = board_for(size, fences)
+        self._board = board                      # tables shared by every game of this size
+        self._h_walls = board.h_border           # top and bottom edges of the board
+        self._v_walls = board.v_border           # left and right edges of the board
+        self._p1_distances = None        # built on first use, see distance_map
+        self._p2_distances = None
         self._turn = 1                   # initialized to player 1
-        self._p1 = (4, 0)
-        self._p2 = (4, 8)
-        self._player = self._p1
-        self._p1Fences = 10
-        self._p2Fences = 10
+        self._p1 = board.start[0]        # tile (4, 0)
+        self._p2 = board.start[1]        # tile (4, 8)
+        self._player = board.positions[self._p1]
+        self._p1Fences = fences
+        self._p2Fences = fences
         self._winner = None
+        self._undo = None                # used by make_move and unmake_move, made on first use
+        self._listener = None            # called with each move move_pawn or place_fence makes
+        self._stats = None               # counters and timers, off until enable_stats
+        self._stats_hook = None
+        self._profiler = None
+        self._timing = None              # names of the timed calls running right now
+        self._nodes = 0                  # tiles visited by path searches so far
+        self._hash = board.start_hash
 
     def print_board(self):
         """
         Prints the board in its current state
         """
-        for i in range(0, 19):
-            print(self._board[i])
+        for row in self.build_board():
+            print(row)
+
+    def build_board(self):
+        """
+        Builds the printable 19x10 representation of the board from
+        the fence bitmasks and pawn positions (larger or smaller for other
+        sizes of board). Only used for display, move validation never looks at it
+        """
+        size = self._board.size
+        board = []
+        for y in range(0, size + 1):
+            board.append(['+==' if self.has_hor_fence(x, y) else '+  ' for x in range(0, size)] + ['+'])
+            if y < size:
+                board.append([self.tile_string(x, y) for x in range(0, size)] + ['|'])
+        return board
+
+    def tile_string(self, x, y):
+        """
+        Takes x and y, returns the printable string for a tile,
+        showing the fence on its left edge and any pawn on it
+        """
+        left = '|' if self.has_vert_fence(x, y) else ' '
+        tile = y * self._board.size + x
+        if self._p1 == tile:
+            return left + 'P1'
+        elif self._p2 == tile:
+            return left + 'P2'
+        return left + '  '
 
     def move_pawn(self, turn, move):
         """
@@ -78,60 +548,47 @@ class QuoridorGame:
         implement the move and calls check_for_win to check if the game has
         been won.Returns False if move is invalid
         """
+        if self._stats is not None and 'move_pawn' not in self._timing:
+            return self.timed('move_pawn', self.move_pawn, turn, move)
         x = move[0]
         y = move[1]
-        if x < 0 or x > 8:                       # checks for out-of-bounds move
+        last = self._board.size - 1
+        if x < 0 or x > last:                    # checks for out-of-bounds move
             return False
-        if y < 0 or y > 8:
+        if y < 0 or y > last:
             return False
         if self.correct_turn(turn) is False:     # checks if move is in turn
             return False
-        if self._player == move:                 # checks if pawn didn't move
+        if self._player == (x, y):               # checks if pawn didn't move
             return False
         if self.move_direction(x, y) is False:   # sends to move_direction to check for valid move
             return False
-        if 'P' in self.pawn_conversion(x, y):    # checks if pawn already occupies tile
+        if self.has_pawn(x, y):                  # checks if pawn already occupies tile
             return False
         else:
             self.valid_move(turn, x, y)          # handles valid move
             self.check_for_win(turn, y)
+            self.notify(turn, ('p', (x, y)))
             return True
 
     def valid_move(self, turn, x, y):
         """
         Takes turn, x, and y, implements player's move if it is
-        valid by updating data member which holds coordinates
-        and updating the board to reflect the move
+        valid by updating data member which holds the tile
         """
 
-        # updates player coordinates and turn on valid move
+        # updates player tile, turn, and hash on valid move
+        board = self._board
+        tile = y * board.size + x
         if turn == 1:
-            x_source = self._p1[0]
-            y_source = self._p1[1]
-            self._p1 = (x, y)
+            self._hash ^= board.pawn_keys[0][self._p1] ^ board.pawn_keys[0][tile] ^ board.turn_key
+            self._p1 = tile
             self._turn = 2
         elif turn == 2:
-            x_source = self._p2[0]
-            y_source = self._p2[1]
-            self._p2 = (x, y)
+            self._hash ^= board.pawn_keys[1][self._p2] ^ board.pawn_keys[1][tile] ^ board.turn_key
+            self._p2 = tile
             self._turn = 1
 
-        # sets board after valid move
-        if '|' in self.pawn_conversion(x_source, y_source):
-            self.set_board('|  ', x_source, y_source)
-        else:
-            self.set_board('   ', x_source, y_source)
-        if '|' in self.pawn_conversion(x, y):
-            if turn == 1:
-                self.set_board('|P1', x, y)
-            else:
-                self.set_board('|P2', x, y)
-        else:
-            if turn == 1:
-                self.set_board(' P1', x, y)
-            else:
-                self.set_board(' P2', x, y)
-
     def correct_turn(self, turn):
         """
         Takes turn, checks if a player's move (pawn move or fence
@@ -144,9 +601,9 @@ class QuoridorGame:
 
         # sets player data member if move is in turn
         if turn == 1:
-            self._player = self._p1
+            self._player = self._board.positions[self._p1]
         else:
-            self._player = self._p2
+            self._player = self._board.positions[self._p2]
 
     def move_direction(self, x, y):
         """
@@ -173,41 +630,26 @@ class QuoridorGame:
         if abs(self._player[0] - x) + abs(self._player[1] - y) > 2:
             return False
 
-    def set_board(self, string, x, y):
+    def has_pawn(self, x, y):
         """
-        Takes x and y, converts coordinates to properly navigate the board,
-        allowing for pawns to be moved and placed correctly
+        Takes x and y, returns True if either pawn is on that tile
         """
-        xp = y * 2 + 1
-        yp = x
-        self._board[xp][yp] = string
+        tile = y * self._board.size + x
+        return tile == self._p1 or tile == self._p2
 
-    def pawn_conversion(self, x, y):
+    def has_hor_fence(self, x, y):
         """
-        Takes x and y, converts pawn coordinates to
-        correctly navigate board
+        Takes x and y, returns True if there is a fence (or the
+        edge of the board) on the top edge of tile (x, y)
         """
-        xp = y * 2 + 1
-        yp = x
-        return self._board[xp][yp]
+        return self._h_walls >> (y * self._board.size + x) & 1 == 1
 
-    def hor_fence_conversion(self, x, y):
+    def has_vert_fence(self, x, y):
         """
-        Takes x and y, converts horizontal fence
-        coordinates to correctly navigate board
+        Takes x and y, returns True if there is a fence (or the
+        edge of the board) on the left edge of tile (x, y)
         """
-        xf = y * 2
-        yf = x
-        return self._board[xf][yf]
-
-    def vert_fence_conversion(self, x, y):
-        """
-        Takes x and y, converts vertical fence
-        coordinates to correctly navigate board
-        """
-        xf = y * 2 + 1
-        yf = x
-        return self._board[xf][yf]
+        return self._v_walls >> (y * (self._board.size + 1) + x) & 1 == 1
 
     def vertical_check(self, x, y):
         """
@@ -226,10 +668,10 @@ class QuoridorGame:
 
         # checks for fences
         elif self._player[1] - y == 1:
-            if self.hor_fence_conversion(x, y + 1) == '+==':
+            if self.has_hor_fence(x, y + 1):
                 return False
         elif self._player[1] - y == -1:
-            if self.hor_fence_conversion(x, y) == '+==':
+            if self.has_hor_fence(x, y):
                 return False
 
     def hor_check(self, x, y):
@@ -249,12 +691,10 @@ class QuoridorGame:
 
         # checks for fences
         elif self._player[0] - x == 1:
-            if '|' in self.vert_fence_conversion(x + 1, y):
-                print("fence left")
+            if self.has_vert_fence(x + 1, y):
                 return False
         elif self._player[0] - x == -1:
-            if '|' in self.vert_fence_conversion(x, y):
-                print("fence right")
+            if self.has_vert_fence(x, y):
                 return False
 
     def vert_jump_check(self, x, y):
@@ -264,20 +704,20 @@ class QuoridorGame:
         """
         # down jump
         if self._player[1] - y == 2:
-            if 'P' not in self.pawn_conversion(x, y + 1):
+            if not self.has_pawn(x, y + 1):
                 return False
-            elif self.hor_fence_conversion(x, y + 2) == '+==':
+            elif self.has_hor_fence(x, y + 2):
                 return False
-            elif self.hor_fence_conversion(x, y + 1) == "+==":
+            elif self.has_hor_fence(x, y + 1):
                 return False
 
         # up jump
         else:
-            if 'P' not in self.pawn_conversion(x, y - 1):
+            if not self.has_pawn(x, y - 1):
                 return False
-            elif self.hor_fence_conversion(x, y - 1) == '+==':
+            elif self.has_hor_fence(x, y - 1):
                 return False
-            elif self.hor_fence_conversion(x, y) == "+==":
+            elif self.has_hor_fence(x, y):
                 return False
 
     def hor_jump_check(self, x, y):
@@ -287,20 +727,20 @@ class QuoridorGame:
         """
         # right jump
         if self._player[0] - x == 2:
-            if 'P' not in self.pawn_conversion(x + 1, y):
+            if not self.has_pawn(x + 1, y):
                 return False
-            elif '|' in self.vert_fence_conversion(x + 2, y):
+            elif self.has_vert_fence(x + 2, y):
                 return False
-            elif '|' in self.vert_fence_conversion(x + 1, y):
+            elif self.has_vert_fence(x + 1, y):
                 return False
 
         # left jump
         else:
-            if 'P' not in self.pawn_conversion(x - 1, y):
+            if not self.has_pawn(x - 1, y):
                 return False
-            elif '|' in self.vert_fence_conversion(x - 1, y):
+            elif self.has_vert_fence(x - 1, y):
                 return False
-            elif '|' in self.vert_fence_conversion(x, y):
+            elif self.has_vert_fence(x, y):
                 return False
 
     def diagonal_check(self, x, y):
@@ -338,15 +778,15 @@ class QuoridorGame:
         Takes x and y, checks validity of up right move,
         returns False to diagonal_check if move is invalid
         """
-        if 'P' in self.pawn_conversion(x - 1, y):
-            if self.hor_fence_conversion(x - 1, y) == '+==':
-                if self.hor_fence_conversion(x - 1, y + 1) != '+==':
-                    if '|' not in self.vert_fence_conversion(x, y):
+        if self.has_pawn(x - 1, y):
+            if self.has_hor_fence(x - 1, y):
+                if not self.has_hor_fence(x - 1, y + 1):
+                    if not self.has_vert_fence(x, y):
                         return True
-        elif 'P' in self.pawn_conversion(x, y + 1):
-            if '|' in self.vert_fence_conversion(x + 1, y + 1):
-                if '|' not in self.vert_fence_conversion(x, y + 1):
-                    if self.hor_fence_conversion(x, y + 1) != '+==':
+        elif self.has_pawn(x, y + 1):
+            if self.has_vert_fence(x + 1, y + 1):
+                if not self.has_vert_fence(x, y + 1):
+                    if not self.has_hor_fence(x, y + 1):
                         return True
 
     def down_right_check(self, x, y):
@@ -354,15 +794,15 @@ class QuoridorGame:
         Takes x and y, checks validity of down right move,
         returns False to diagonal_check if move is invalid
         """
-        if 'P' in self.pawn_conversion(x, y - 1):
-            if '|' in self.vert_fence_conversion(x + 1, y - 1):
-                if '|' not in self.vert_fence_conversion(x, y - 1):
-                    if self.hor_fence_conversion(x, y) != '+==':
+        if self.has_pawn(x, y - 1):
+            if self.has_vert_fence(x + 1, y - 1):
+                if not self.has_vert_fence(x, y - 1):
+                    if not self.has_hor_fence(x, y):
                         return True
-        elif 'P' in self.pawn_conversion(x - 1, y):
-            if self.hor_fence_conversion(x - 1, y + 1) == '+==':
-                if self.hor_fence_conversion(x - 1, y) != '+==':
-                    if '|' not in self.vert_fence_conversion(x, y):
+        elif self.has_pawn(x - 1, y):
+            if self.has_hor_fence(x - 1, y + 1):
+                if not self.has_hor_fence(x - 1, y):
+                    if not self.has_vert_fence(x, y):
                         return True
 
     def down_left_check(self, x, y):
@@ -370,15 +810,15 @@ class QuoridorGame:
         Takes x and y, checks validity of down left move,
         returns False to diagonal_check if move is invalid
         """
-        if 'P' in self.pawn_conversion(x + 1, y):
-            if self.hor_fence_conversion(x + 1, y + 1) == '+==':
-                if self.hor_fence_conversion(x + 1, y) != '+==':
-                    if '|' not in self.vert_fence_conversion(x + 1, y):
+        if self.has_pawn(x + 1, y):
+            if self.has_hor_fence(x + 1, y + 1):
+                if not self.has_hor_fence(x + 1, y):
+                    if not self.has_vert_fence(x + 1, y):
                         return True
-        elif 'P' in self.pawn_conversion(x, y - 1):
-            if '|' in self.vert_fence_conversion(x, y - 1):
-                if '|' not in self.vert_fence_conversion(x + 1, y - 1):
-                    if self.hor_fence_conversion(x, y) != '+==':
+        elif self.has_pawn(x, y - 1):
+            if self.has_vert_fence(x, y - 1):
+                if not self.has_vert_fence(x + 1, y - 1):
+                    if not self.has_hor_fence(x, y):
                         return True
 
     def up_left_check(self, x, y):
@@ -386,15 +826,15 @@ class QuoridorGame:
         Takes x and y, checks validity of up left move,
         returns False to diagonal_check if move is invalid
         """
-        if 'P' in self.pawn_conversion(x, y + 1):
-            if '|' in self.vert_fence_conversion(x, y + 1):
-                if '|' not in self.vert_fence_conversion(x + 1, y + 1):
-                    if self.hor_fence_conversion(x, y + 1) != '+==':
+        if self.has_pawn(x, y + 1):
+            if self.has_vert_fence(x, y + 1):
+                if not self.has_vert_fence(x + 1, y + 1):
+                    if not self.has_hor_fence(x, y + 1):
                         return True
-        if 'P' in self.pawn_conversion(x + 1, y):
-            if self.hor_fence_conversion(x + 1, y) == '+==':
-                if self.hor_fence_conversion(x + 1, y + 1) != '+==':
-                    if '|' not in self.vert_fence_conversion(x + 1, y):
+        if self.has_pawn(x + 1, y):
+            if self.has_hor_fence(x + 1, y):
+                if not self.has_hor_fence(x + 1, y + 1):
+                    if not self.has_vert_fence(x + 1, y):
                         return True
 
     def place_fence(self, turn, direction, position):
@@ -406,6 +846,8 @@ class QuoridorGame:
         valid, updates player's fence count if placement is valid,
         and returns False if move is invalid
         """
+        if self._stats is not None and 'place_fence' not in self._timing:
+            return self.timed('place_fence', self.place_fence, turn, direction, position)
         x = position[0]
         y = position[1]
 
@@ -422,7 +864,25 @@ class QuoridorGame:
             return False
 
         # check fair play rule if fence placement is valid
-        return self.is_fair_play(turn, direction, x, y)
+        result = self.is_fair_play(turn, direction, x, y)
+        if result is True:
+            self.notify(turn, (direction, (x, y)))
+        return result
+
+    def set_listener(self, listener):
+        """
+        Takes a function (or None to remove it) that is called with the turn and
+        the move, ('p', (x, y)) or ('h' / 'v', (x, y)), every time move_pawn or
+        place_fence makes a move. Moves played with make_move aren't reported
+        """
+        self._listener = listener
+
+    def notify(self, turn, move):
+        """
+        Takes turn and move, passes a move that was just made to the listener if there is one
+        """
+        if self._listener is not None:
+            self._listener(turn, move)
 
     def remaining_fences(self, turn):
         """
@@ -437,34 +897,32 @@ class QuoridorGame:
 
     def fence_check(self, direction, position):
         """
-        Takes direction and position, checks if a fence already exists
-        in position and returns False if it does, places fence if not
+        Takes direction and position, checks if the position is on the
+        board and if a fence already exists in position and returns False
+        if it does, places fence if not
         """
+        if self._stats is not None and 'fence_check' not in self._timing:
+            return self.timed('fence_check', self.fence_check, direction, position)
         x = position[0]
         y = position[1]
+        board = self._board
+        size = board.size
 
         # horizontal fence check
         if direction == 'h':
-            if self.hor_fence_conversion(x, y) == '+==':
+            if x < 0 or x >= size or y < 0 or y > size or self.has_hor_fence(x, y):
                 return False
-            else:
-                xf = y * 2
-                yf = x
-                self._board[xf][yf] = '+=='
+            self._h_walls |= 1 << (y * size + x)
+            self._hash ^= board.h_fence_keys[y * size + x]
 
         # vertical fence check
         elif direction == 'v':
-            if '|' in self.vert_fence_conversion(x, y):
+            if x < 0 or x > size or y < 0 or y >= size or self.has_vert_fence(x, y):
                 return False
-            else:
-                xf = y * 2 + 1
-                yf = x
-                if 'P1' in self._board[xf][yf]:
-                    self._board[xf][yf] = '|P1'
-                elif 'P2' in self._board[xf][yf]:
-                    self._board[xf][yf] = '|P2'
-                else:
-                    self._board[xf][yf] = '|  '
+            self._v_walls |= 1 << (y * (size + 1) + x)
+            self._hash ^= board.v_fence_keys[y * (size + 1) + x]
+        else:
+            return False
 
     def remove_fence(self, direction, x, y):
         """
@@ -472,94 +930,529 @@ class QuoridorGame:
         from that position of board. Called after
         fair play rule has been broken
         """
+        board = self._board
+
         # remove horizontal fence
         if direction == "h":
-            xf = y * 2
-            yf = x
-            self._board[xf][yf] = '+  '
+            self._h_walls &= ~(1 << (y * board.size + x))
+            self._hash ^= board.h_fence_keys[y * board.size + x]
 
         # remove vertical fence
         elif direction == 'v':
-            xf = y * 2 + 1
-            yf = x
-            if 'P1' in self._board[xf][yf]:
-                self._board[xf][yf] = ' P1'
-            elif 'P2' in self._board[xf][yf]:
-                self._board[xf][yf] = ' P2'
+            self._v_walls &= ~(1 << (y * (board.size + 1) + x))
+            self._hash ^= board.v_fence_keys[y * (board.size + 1) + x]
+
+    def legal_pawn_moves(self, player=None):
+        """
+        Takes an optional player (whoever's turn it is by default), returns a list
+        of every (x, y) that player's pawn can legally move to, including jumps and
+        diagonal moves. Works from the precomputed neighbor table and doesn't change
+        the game. Returns an empty list if the game has been won
+        """
+        if player is None:
+            player = self._turn
+        if self._winner is not None:
+            return []
+        board = self._board
+        if player == 1:
+            tiles = pawn_destinations(self._h_walls, self._v_walls, self._p1, self._p2, board.neighbors)
+        else:
+            tiles = pawn_destinations(self._h_walls, self._v_walls, self._p2, self._p1, board.neighbors)
+        return [board.positions[tile] for tile in tiles]
+
+    def legal_fences(self, player=None):
+        """
+        Takes an optional player (whoever's turn it is by default), returns a list of
+        every (direction, (x, y)) fence that player can legally place, leaving out
+        fences that break the fair play rule. Fences are single edges, so a slot only
+        conflicts with a fence in the same slot and the fence bitmasks are already the
+        mask of open slots. A fence can only lock the opponent in if it crosses their
+        current shortest path, so only the slots on the path's steps (found in the
+        board's edge_slots) have to be checked, with detour_exists. Doesn't change the game
+        """
+        if player is None:
+            player = self._turn
+        if self._winner is not None or self.remaining_fences(player) is False:
+            return []
+        path = self.path_tiles(3 - player)
+        if not path:                     # opponent is already fenced in, any fence breaks fair play
+            return []
+        h_walls = self._h_walls
+        v_walls = self._v_walls
+        fences = [(slot[0], slot[1]) for slot in self._board.fence_slots
+                  if not (h_walls & slot[2] or v_walls & slot[3])]
+        distances = self.distance_map(3 - player)
+        edge_slots = self._board.edge_slots
+        for start, step in zip(path, path[1:]):
+            slot = edge_slots[start, step]
+            if not self.detour_exists(start, distances, h_walls | slot[2], v_walls | slot[3]):
+                fences.remove((slot[0], slot[1]))
+        return fences
+
+    def fence_allowed(self, direction, position, player=None):
+        """
+        Takes direction, position, and an optional player (whoever's turn it is by
+        default), returns True if that player could place the fence right now,
+        including the fair play rule, without placing it
+        """
+        if player is None:
+            player = self._turn
+        if self._winner is not None or self.remaining_fences(player) is False:
+            return False
+        x = position[0]
+        y = position[1]
+        size = self._board.size
+        if direction == 'h' and 0 <= x < size and 1 <= y < size and not self.has_hor_fence(x, y):
+            return self.path_exists(3 - player, self._h_walls | 1 << (y * size + x), self._v_walls)
+        if direction == 'v' and 1 <= x < size and 0 <= y < size and not self.has_vert_fence(x, y):
+            return self.path_exists(3 - player, self._h_walls, self._v_walls | 1 << (y * (size + 1) + x))
+        return False
+
+    def get_turn(self):
+        """
+        Returns the player (1 or 2) whose turn it is
+        """
+        return self._turn
+
+    def get_winner(self):
+        """
+        Returns the player who has won, or None if the game is still going
+        """
+        return self._winner
+
+    def get_size(self):
+        """
+        Returns the width of the board in tiles
+        """
+        return self._board.size
+
+    def get_start_fences(self):
+        """
+        Returns the number of fences each player started the game with
+        """
+        return self._board.fences
+
+    def get_pawn(self, player):
+        """
+        Takes player, returns the (x, y) tile that player's pawn is on
+        """
+        return self._board.positions[self._p1 if player == 1 else self._p2]
+
+    def get_fences(self, player):
+        """
+        Takes player, returns the number of fences that player has left
+        """
+        return self._p1Fences if player == 1 else self._p2Fences
+
+    def shortest_path(self, player):
+        """
+        Takes player, returns a list of the (x, y) tiles along one shortest path
+        from that player's pawn to the goal row (not counting the tile the pawn is
+        on), ignoring the other pawn, or None if there is no path
+        """
+        path = self.path_tiles(player)
+        if not path:
+            return None
+        return [self._board.positions[tile] for tile in path[1:]]
+
+    def path_tiles(self, player):
+        """
+        Takes player, returns the list of tiles along one shortest path from that
+        player's pawn to the goal row, starting with the tile the pawn is on, or an
+        empty list if there is no path. Follows the player's distance map downhill
+        """
+        distances = self.distance_map(player)
+        neighbors = self._board.neighbors
+        tile = self._p1 if player == 1 else self._p2
+        if distances[tile] == self._board.unreachable:
+            return []
+        path = [tile]
+        while distances[tile] > 0:
+            for neighbor, h_bit, v_bit in neighbors[tile]:
+                if not (self._h_walls & h_bit or self._v_walls & v_bit):
+                    if distances[neighbor] == distances[tile] - 1:
+                        break
+            tile = neighbor
+            path.append(tile)
+        return path
+
+    def zobrist_hash(self):
+        """
+        Returns the 64-bit Zobrist hash of the current position, covering both
+        pawns, every fence, whose turn it is, and the fences each player has left.
+        The hash is kept up to date as moves are made rather than recomputed
+        """
+        return self._hash
+
+    def snapshot(self):
+        """
+        Returns the position as a tuple of plain ints that is cheap to pickle and
+        can be passed to from_snapshot: the fence bitmasks, the pawn tiles, whose
+        turn it is, the fences each player has left, and the winner (0 for none).
+        Being a tuple of ints it is also hashable, so it can key a dictionary
+        """
+        return (self._h_walls, self._v_walls, self._p1, self._p2, self._turn,
+                self._p1Fences, self._p2Fences, self._winner or 0)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, size=9, fences=10):
+        """
+        Takes a tuple returned by snapshot and the board size and starting fences of
+        the game it came from, returns a new game in that position. Distance maps are
+        built again when they are first needed. A snapshot doesn't hold its board, so
+        it is checked against the one given: raises ValueError if the fence bitmasks
+        don't have the edges of that board or go past them, or the pawns, turn, fences
+        left, or winner don't fit it
+        """
+        game = cls(size, fences)
+        if not snapshot_fits(snapshot, game._board):
+            raise ValueError('snapshot is not of a %dx%d game with %d fences' % (size, size, fences))
+        (game._h_walls, game._v_walls, game._p1, game._p2, game._turn,
+         game._p1Fences, game._p2Fences, winner) = snapshot
+        game._winner = winner or None
+        game._hash = zobrist_hash(game._h_walls, game._v_walls, game._p1, game._p2,
+                                  game._turn, game._p1Fences, game._p2Fences, game._board)
+        return game
+
+    def clone(self):
+        """
+        Returns a copy of the game that can be played on without changing this one.
+        Everything but the undo stack is an int, a tuple, or a bytes object, so the
+        copy shares those with the original, distance maps included, rather than
+        copying them. The copy has no listener and doesn't keep stats
+        """
+        game = self.__class__.__new__(self.__class__)
+        game._board, game._h_walls, game._v_walls = self._board, self._h_walls, self._v_walls
+        game._p1_distances, game._p2_distances = self._p1_distances, self._p2_distances
+        game._turn, game._p1, game._p2, game._player = self._turn, self._p1, self._p2, self._player
+        game._p1Fences, game._p2Fences, game._winner = self._p1Fences, self._p2Fences, self._winner
+        game._undo = list(self._undo) if self._undo else None
+        game._listener = game._stats = game._stats_hook = game._profiler = game._timing = None
+        game._nodes, game._hash = self._nodes, self._hash
+        return game
+
+    def legal_moves(self):
+        """
+        Returns every legal move for whoever's turn it is, in the form
+        make_move takes, with the pawn moves first
+        """
+        moves = [('p', position) for position in self.legal_pawn_moves()]
+        moves.extend(self.legal_fences())
+        return moves
+
+    def make_move(self, move):
+        """
+        Takes a move, ('p', (x, y)) to move the pawn or ('h', (x, y)) / ('v', (x, y))
+        to place a fence, and plays it for whoever's turn it is. The move isn't
+        validated, so it should come from legal_moves. Pushes what the move changes
+        onto the undo stack so unmake_move can take it back
+        """
+        kind, (x, y) = move
+        turn = self._turn
+        undo = self._undo
+        if undo is None:
+            undo = self._undo = []
+        if kind == 'p':
+            undo.append(('p', turn, self._p1 if turn == 1 else self._p2, self._winner, self._hash))
+            self.valid_move(turn, x, y)
+            self.check_for_win(turn, y)
+            return
+        undo.append((kind, turn, self._h_walls, self._v_walls, self._p1_distances,
+                     self._p2_distances, self._hash))
+        self.fence_check(kind, (x, y))
+        self.update_distances(kind, x, y)
+        self.use_fence(turn)
+
+    def unmake_move(self):
+        """
+        Takes back the last move played with make_move by putting
+        back the values that were saved on the undo stack
+        """
+        record = self._undo.pop()
+        if record[0] == 'p':
+            kind, turn, tile, self._winner, self._hash = record
+            if turn == 1:
+                self._p1 = tile
+            else:
+                self._p2 = tile
+        else:
+            (kind, turn, self._h_walls, self._v_walls, self._p1_distances,
+             self._p2_distances, self._hash) = record
+            if turn == 1:
+                self._p1Fences += 1
             else:
-                self._board[xf][yf] = '   '
+                self._p2Fences += 1
+        self._turn = turn
 
     def is_fair_play(self, turn, direction, x, y):
         """Takes turn, direction, x, and y, called after otherwise
         valid fence has been placed to determine if the placement
         breaks the fair play rule by bocking off all paths to the
         opponent's baseline. If fair play rule has been broken, calls
-        remove_fence to remove the fence from the board and returns
-        'breaks the fair play rule'. If fair play rule has not been
-        broken, decrements player's fence inventory and sets turn for
-        next player"""
-        import copy
-        self._fair_play_board1 = copy.deepcopy(self._fair_play_board)
-        if turn == 1:
-            x1 = self._p2[0]
-            y1 = self._p2[1]
-            if self.rec_fair_play(1, x1, y1) is not True:
-                self.remove_fence(direction, x, y)
-                return 'breaks the fair play rule'
-            else:
-                self._p1Fences -= 1
-                self._turn = 2
-                return True
-        elif turn == 2:
-            x2 = self._p1[0]
-            y2 = self._p1[1]
-            if self.rec_fair_play(2, x2, y2) is not True:
-                self.remove_fence(direction, x, y)
-                return 'breaks the fair play rule'
-            else:
-                self._p2Fences -= 1
-                self._turn = 1
-                return True
+        remove_fence to remove the fence from the board, puts the
+        distance maps back and returns 'breaks the fair play rule'.
+        If fair play rule has not been broken, decrements player's
+        fence inventory and sets turn for next player"""
+        if self._stats is not None and 'is_fair_play' not in self._timing:
+            return self.timed('is_fair_play', self.is_fair_play, turn, direction, x, y)
+        p1_distances = self._p1_distances
+        p2_distances = self._p2_distances
+        self.update_distances(direction, x, y)
+        if self._stats is not None:
+            self._nodes += changed_tiles(p1_distances, self._p1_distances)
+            self._nodes += changed_tiles(p2_distances, self._p2_distances)
+        if self.has_path(3 - turn) is not True:
+            self.remove_fence(direction, x, y)
+            self._p1_distances = p1_distances
+            self._p2_distances = p2_distances
+            return 'breaks the fair play rule'
+        self.use_fence(turn)
+        return True
 
-    def rec_fair_play(self, turn, x, y):
+    def use_fence(self, turn):
         """
-        Takes turn, x, and y, determines if player has at least one path
-        to the opponent's baseline. Checks for fences and recursively calls all four move
-        directions which are not obstructed by fences, flipping tiles from False to True.
-        Returns True if a tile on the opponent's row has been flipped
+        Takes turn, takes one fence from that player's inventory
+        and passes the turn, updating the hash to match
         """
-        self._fair_play_board1[y][x] = True
-        paintUp = False
-        paintRight = False
-        paintDown = False
-        paintLeft = False
-        # player 1 placed fence, checks if player 2 has access to player 1's baseline
+        keys = self._board.fence_count_keys
         if turn == 1:
-            if True in self._fair_play_board1[0]:
-                return True
-        # player 2 placed fence, checks if player 1 has access to player 2's baseline
-        elif turn == 2:
-            if True in self._fair_play_board1[8]:
+            self._hash ^= keys[0][self._p1Fences] ^ keys[0][self._p1Fences - 1]
+            self._p1Fences -= 1
+            self._turn = 2
+        else:
+            self._hash ^= keys[1][self._p2Fences] ^ keys[1][self._p2Fences - 1]
+            self._p2Fences -= 1
+            self._turn = 1
+        self._hash ^= self._board.turn_key
+
+    def update_distances(self, direction, x, y):
+        """
+        Takes direction, x, and y of a fence that was just placed, brings whichever
+        distance maps have been built up to date: from DISTANCE_CACHE if the new
+        fence layout is there, otherwise by repairing the map, which is then cached
+        """
+        board = self._board
+        tile_a, tile_b = fence_tiles(direction, x, y, board.size)
+        if self._p1_distances is not None:
+            self._p1_distances = self.repaired(self._p1_distances, board.size - 1, tile_a, tile_b)
+        if self._p2_distances is not None:
+            self._p2_distances = self.repaired(self._p2_distances, 0, tile_a, tile_b)
+
+    def repaired(self, distances, goal, tile_a, tile_b):
+        """
+        Takes a distance map from before a fence went in between tile_a and tile_b and
+        its goal row, returns the map for the fences now on the board, from the cache
+        or repaired
+        """
+        key = (self._board.size, goal, self._h_walls, self._v_walls)
+        cached = DISTANCE_CACHE.lookup(key)
+        if cached is None:
+            cached = repair_distances(distances, self._h_walls, self._v_walls, tile_a, tile_b, self._board)
+            DISTANCE_CACHE.store(key, cached)
+        return cached
+
+    def distance_map(self, player):
+        """
+        Takes player, returns a bytes object with the number of steps from every tile
+        (indexed by y * 9 + x) to that player's goal row, ignoring pawns. Tiles
+        fenced off from the goal hold UNREACHABLE. On boards of more than 254 tiles
+        it is a 16-bit array and fenced off tiles hold 65535 instead. The map is
+        taken from DISTANCE_CACHE (or built) the first time it is asked for and
+        brought up to date as fences are placed after that
+        """
+        board = self._board
+        if player == 1:
+            if self._p1_distances is None:
+                self._p1_distances = cached_distances(self._h_walls, self._v_walls, board.size - 1, board)
+            return self._p1_distances
+        if self._p2_distances is None:
+            self._p2_distances = cached_distances(self._h_walls, self._v_walls, 0, board)
+        return self._p2_distances
+
+    def distance_to_goal(self, player):
+        """
+        Takes player, returns the fewest steps that player's pawn needs to reach
+        the goal row (ignoring the other pawn), or None if there is no path
+        """
+        distance = self.distance_map(player)[self._p1 if player == 1 else self._p2]
+        if distance == self._board.unreachable:
+            return None
+        return distance
+
+    def has_path(self, player):
+        """
+        Takes player, returns True if that player's pawn has at least one path
+        to the opponent's baseline. Looks at the player's distance map if one
+        has been built, otherwise calls path_exists
+        """
+        distances = self._p1_distances if player == 1 else self._p2_distances
+        if distances is not None:
+            return distances[self._p1 if player == 1 else self._p2] != self._board.unreachable
+        return self.path_exists(player, self._h_walls, self._v_walls)
+
+    def path_exists(self, player, h_walls, v_walls):
+        """
+        Takes player and a pair of fence bitmasks, returns True if that player's pawn
+        has at least one path to the opponent's baseline with those fences on the
+        board. Answers from DISTANCE_CACHE if it has the map, otherwise calls search_path
+        """
+        board = self._board
+        goal = board.size - 1 if player == 1 else 0
+        distances = DISTANCE_CACHE.lookup((board.size, goal, h_walls, v_walls))
+        if distances is not None:
+            return distances[self._p1 if player == 1 else self._p2] != board.unreachable
+        return self.search_path(player, h_walls, v_walls)
+
+    def search_path(self, player, h_walls, v_walls):
+        """
+        Takes player and a pair of fence bitmasks, returns True if that player's pawn
+        has at least one path to the opponent's baseline with those fences on the
+        board. Does a breadth first search out from the pawn
+        that stops as soon as a tile on the goal row is reached. Tiles are marked
+        in a visited list shared by every game on the thread that is reused between
+        calls by stamping it with a new generation number, so nothing has to be
+        cleared or copied
+        """
+        if self._stats is not None and 'search_path' not in self._timing:
+            return self.timed('search_path', self.search_path, player, h_walls, v_walls)
+        board = self._board
+        generation = next(GENERATIONS)
+        scratch = board.scratch
+        visited = scratch.visited
+        queue = scratch.queue
+        neighbors = board.neighbors
+        size = board.size
+        queue[0] = self._p1 if player == 1 else self._p2
+        goal = size - 1 if player == 1 else 0
+        visited[queue[0]] = generation
+        head, tail = 0, 1
+        while head < tail:
+            tile = queue[head]
+            head += 1
+            if tile // size == goal:
+                self._nodes += tail
                 return True
+            for neighbor, h_bit, v_bit in neighbors[tile]:
+                if not (h_walls & h_bit or v_walls & v_bit) and visited[neighbor] != generation:
+                    visited[neighbor] = generation
+                    queue[tail] = neighbor
+                    tail += 1
+        self._nodes += tail
+        return False
 
-        if self.hor_fence_conversion(x, y) != '+==':
-            if self._fair_play_board1[y - 1][x] is False:
-                paintUp = self.rec_fair_play(turn, x, y - 1)
+    def detour_exists(self, start, distances, h_walls, v_walls):
+        """
+        Takes a tile on a player's shortest path, the player's distance map from before
+        a new fence went in across the path, and the fence bitmasks with the fence added,
+        returns True if the player can still reach the goal. Searches out from start
+        until it finds any other tile no further from the goal than start: the old
+        shortest paths from that tile never pass through start, so the new fence can't
+        be on them. Usually that tile is right next door. Uses the same stamped visited
+        list as search_path, with the queue used as a stack
+        """
+        if self._stats is not None and 'detour_exists' not in self._timing:
+            return self.timed('detour_exists', self.detour_exists, start, distances, h_walls, v_walls)
+        generation = next(GENERATIONS)
+        scratch = self._board.scratch
+        visited = scratch.visited
+        stack = scratch.queue
+        neighbors = self._board.neighbors
+        limit = distances[start]
+        visited[start] = generation
+        stack[0] = start
+        top = 1
+        while top:
+            top -= 1
+            for neighbor, h_bit, v_bit in neighbors[stack[top]]:
+                if not (h_walls & h_bit or v_walls & v_bit) and visited[neighbor] != generation:
+                    if distances[neighbor] <= limit:
+                        self._nodes += 1
+                        return True
+                    visited[neighbor] = generation
+                    stack[top] = neighbor
+                    top += 1
+                    self._nodes += 1
+        return False
 
-        if self.hor_fence_conversion(x, y + 1) != '+==':
-            if self._fair_play_board1[y + 1][x] is False:
-                paintDown = self.rec_fair_play(turn, x, y + 1)
+    def enable_stats(self, hook=None, profile=False):
+        """
+        Takes an optional hook and whether to profile, starts counting and timing calls
+        to move_pawn, place_fence, fence_check, is_fair_play, search_path, and detour_exists
+        on this game. Each call's time includes the timed calls inside it, and its nodes
+        are the tiles path searches visited during it (for is_fair_play, also the tiles
+        whose distance had to be repaired). The hook is called with the name, nanoseconds,
+        and nodes after every timed call. With profile, a cProfile profiler runs during
+        this game's timed calls only, see dump_profile. While stats are off each of those
+        methods only pays for one check
+        """
+        self._stats = {}
+        self._stats_hook = hook
+        self._profiler = cProfile.Profile() if profile else None
+        self._timing = set()
 
-        if '|' not in self.vert_fence_conversion(x + 1, y):
-            if self._fair_play_board1[y][x + 1] is False:
-                paintRight = self.rec_fair_play(turn, x + 1, y)
+    def disable_stats(self):
+        """
+        Stops counting and timing calls, dropping the stats, hook, and profiler
+        """
+        self._stats = self._stats_hook = self._profiler = self._timing = None
 
-        if '|' not in self.vert_fence_conversion(x, y):
-            if self._fair_play_board1[y][x - 1] is False:
-                paintLeft = self.rec_fair_play(turn, x - 1, y)
+    def get_stats(self):
+        """
+        Returns a dictionary with an entry for each kind of timed call made so far:
+        the calls, total and slowest nanoseconds, nodes visited, and the mean
+        nanoseconds and nodes per call. Empty if stats are off
+        """
+        stats = {}
+        for name, entry in (self._stats or {}).items():
+            stats[name] = dict(entry, mean_ns=entry['ns'] / entry['calls'],
+                               nodes_per_call=entry['nodes'] / entry['calls'])
+        return stats
 
-        if paintUp or paintRight or paintDown or paintLeft is True:
-            return True
+    def dump_profile(self, path):
+        """
+        Takes a path, writes what the profiler has seen to it in the cProfile
+        format, which pstats, snakeviz, and flame graph tools can read
+        """
+        if self._profiler is None:
+            raise ValueError('profiling is not turned on for this game')
+        self._profiler.dump_stats(path)
+
+    def timed(self, name, method, *args):
+        """
+        Takes a name, a method, and its arguments, calls the method with the name marked
+        as running (so the method doesn't time itself again) and returns what it returned,
+        adding the call's time and nodes to the stats. The profiler, if any, runs during
+        the outermost timed call
+        """
+        profiler = self._profiler if not self._timing else None
+        self._timing.add(name)
+        nodes = self._nodes
+        if profiler is not None:
+            profiler.enable()
+        start = time.perf_counter_ns()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            if profiler is not None:
+                profiler.disable()
+            self._timing.discard(name)
+            self.add_stat(name, elapsed, self._nodes - nodes)
+
+    def add_stat(self, name, elapsed, nodes):
+        """
+        Takes a name, nanoseconds, and nodes, adds a call to the stats for
+        that name and passes it on to the hook if there is one
+        """
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = self._stats[name] = {'calls': 0, 'ns': 0, 'max_ns': 0, 'nodes': 0}
+        entry['calls'] += 1
+        entry['ns'] += elapsed
+        entry['max_ns'] = max(entry['max_ns'], elapsed)
+        entry['nodes'] += nodes
+        if self._stats_hook is not None:
+            self._stats_hook(name, elapsed, nodes)
 
     def check_for_win(self, turn, y):
         """
@@ -567,7 +1460,7 @@ class QuoridorGame:
         Called by move_pawn after move is determined to be valid
         """
         if turn == 1:
-            if y == 8:
+            if y == self._board.size - 1:
                 self._winner = 1
         else:
             if y == 0:
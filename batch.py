@@ -0,0 +1,313 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: BatchQuoridor keeps many independent games of Quoridor in NumPy arrays and applies a pawn
+# move or fence to every game at once, with the same results QuoridorGame would give. Requires NumPy.
+
+import numpy as np
+
+from Quoridor import QuoridorGame, board_for
+
+ILLEGAL = 0                # place_fences result codes, matching False / True /
+PLACED = 1                 # 'breaks the fair play rule' from QuoridorGame.place_fence
+UNFAIR = 2
+UNREACHABLE = 255          # distance_maps value for tiles fenced off from the goal row (65535 past 254 tiles)
+
+
+class BatchQuoridor:
+    """
+    This represents n games of Quoridor stored as arrays: the tile (y * 9 + x) of
+    each player's pawn, a 10x9 plane of horizontal fences (h[y, x] is the edge above
+    tile (x, y)) and a 9x10 plane of vertical fences (v[y, x] is the edge left of tile
+    (x, y)) with the edges of the board set, the fences each player has left, whose
+    turn it is, and the winner (0 while the game is going). Moves are given as one
+    array entry per game, checked for every game together, and applied where legal.
+    Every game in a batch has the same board size and starting fences, and on other
+    sizes 9 becomes the size and 10 the size plus one
+    """
+
+    def __init__(self, n, size=9, fences=10):
+        """
+        Takes n and an optional board size and number of fences for each
+        player, initializes n games in the starting position
+        """
+        self._size = size
+        self._start_fences = fences
+        self._pawns = np.tile(np.array(board_for(size, fences).start, dtype=np.int32), (n, 1))
+        self._h = np.zeros((n, size + 1, size), dtype=bool)
+        self._h[:, 0, :] = True
+        self._h[:, size, :] = True
+        self._v = np.zeros((n, size, size + 1), dtype=bool)
+        self._v[:, :, 0] = True
+        self._v[:, :, size] = True
+        self._fences = np.full((n, 2), fences, dtype=np.int16)
+        self._turn = np.ones(n, dtype=np.int8)
+        self._winner = np.zeros(n, dtype=np.int8)
+        self._rows = np.arange(n)
+
+    def __len__(self):
+        return len(self._turn)
+
+    @classmethod
+    def from_games(cls, games):
+        """
+        Takes a non-empty list of QuoridorGame objects with the same board size and
+        starting fences, returns a batch holding their positions
+        """
+        batch = cls(len(games), games[0].get_size(), games[0].get_start_fences())
+        for i, game in enumerate(games):
+            batch.load(i, game.snapshot())
+        return batch
+
+    def load(self, i, snapshot):
+        """
+        Takes a game number and a QuoridorGame snapshot, puts
+        that position into game i of the batch
+        """
+        h_walls, v_walls, p1, p2, turn, p1_fences, p2_fences, winner = snapshot
+        size = self._size
+        bits = range(0, size * (size + 1))
+        self._h[i] = np.array([h_walls >> bit & 1 for bit in bits], dtype=bool).reshape(size + 1, size)
+        self._v[i] = np.array([v_walls >> bit & 1 for bit in bits], dtype=bool).reshape(size, size + 1)
+        self._pawns[i] = (p1, p2)
+        self._fences[i] = (p1_fences, p2_fences)
+        self._turn[i] = turn
+        self._winner[i] = winner
+
+    def snapshot(self, i):
+        """
+        Takes a game number, returns the position of game i in the
+        form of QuoridorGame.snapshot
+        """
+        h_walls = sum(1 << int(bit) for bit in np.flatnonzero(self._h[i]))
+        v_walls = sum(1 << int(bit) for bit in np.flatnonzero(self._v[i]))
+        return (h_walls, v_walls, int(self._pawns[i, 0]), int(self._pawns[i, 1]), int(self._turn[i]),
+                int(self._fences[i, 0]), int(self._fences[i, 1]), int(self._winner[i]))
+
+    def game(self, i):
+        """
+        Takes a game number, returns game i as a QuoridorGame
+        """
+        return QuoridorGame.from_snapshot(self.snapshot(i), self._size, self._start_fences)
+
+    def get_size(self):
+        """
+        Returns the width of the board in tiles
+        """
+        return self._size
+
+    def get_pawns(self):
+        """
+        Returns an (n, 2) array with the tile of each player's pawn in every game
+        """
+        return self._pawns.copy()
+
+    def get_turns(self):
+        """
+        Returns an array with the player whose turn it is in every game
+        """
+        return self._turn.copy()
+
+    def get_winners(self):
+        """
+        Returns an array with the winner of every game, 0 for games still going
+        """
+        return self._winner.copy()
+
+    def get_fences(self):
+        """
+        Returns an (n, 2) array with the fences each player has left in every game
+        """
+        return self._fences.copy()
+
+    def move_pawns(self, players, targets):
+        """
+        Takes an array with the player making the move in each game and an (n, 2)
+        array of (x, y) targets, moves every pawn whose move is legal and returns a
+        boolean array with what QuoridorGame.move_pawn would have returned
+        """
+        players = np.asarray(players)
+        targets = np.asarray(targets)
+        legal = self.legal_pawn_moves(players, targets[:, 0], targets[:, 1])
+        rows = self._rows[legal]
+        mover = players[legal] - 1
+        last = self._size - 1
+        self._pawns[rows, mover] = targets[legal, 1] * self._size + targets[legal, 0]
+        won = (targets[legal, 1] == last - last * mover)
+        self._winner[rows[won]] = mover[won] + 1
+        self._turn[rows] = 2 - mover
+        return legal
+
+    def legal_pawn_moves(self, players, x, y):
+        """
+        Takes arrays of players and target x and y, returns a boolean array telling
+        which games allow the move: a step that isn't fenced off or onto the other
+        pawn, a straight jump over the other pawn, or a diagonal move beside the
+        other pawn when a fence or the edge of the board is behind it
+        """
+        mover = np.clip(players, 1, 2) - 1
+        own = self._pawns[self._rows, mover]
+        other = self._pawns[self._rows, 1 - mover]
+        size = self._size
+        ox, oy, tx, ty = own % size, own // size, other % size, other // size
+        dx, dy = x - ox, y - oy
+        own_blocked = self.edge_blocked(ox, oy)
+        other_blocked = self.edge_blocked(tx, ty)
+        ok = (players == self._turn) & (self._winner == 0) & (x >= 0) & (x < size) & (y >= 0) & (y < size)
+        steps = self.step_moves(dx, dy, own_blocked, (x == tx) & (y == ty))
+        jumps = self.jump_moves(dx, dy, ox, oy, tx, ty, own_blocked, other_blocked)
+        diagonals = self.diagonal_moves(dx, dy, ox, oy, tx, ty, own_blocked, other_blocked)
+        return ok & (steps | jumps | diagonals)
+
+    def edge_blocked(self, x, y):
+        """
+        Takes arrays of tile x and y (one per game), returns an (n, 4) boolean
+        array telling whether the up, down, left, and right edges of each tile
+        have a fence or the edge of the board on them
+        """
+        x = np.clip(x, 0, self._size - 1)
+        y = np.clip(y, 0, self._size - 1)
+        rows = self._rows
+        return np.stack((self._h[rows, y, x], self._h[rows, y + 1, x],
+                         self._v[rows, y, x], self._v[rows, y, x + 1]), axis=1)
+
+    def step_moves(self, dx, dy, own_blocked, onto_other):
+        """
+        Takes the move offsets, the mover's blocked edges, and whether the
+        target holds the other pawn, returns which moves are legal steps
+        """
+        step = np.abs(dx) + np.abs(dy) == 1
+        return step & ~own_blocked[self._rows, direction(dx, dy)] & ~onto_other
+
+    def jump_moves(self, dx, dy, ox, oy, tx, ty, own_blocked, other_blocked):
+        """
+        Takes the move offsets, both pawns' x and y, and both pawns' blocked
+        edges, returns which moves are legal straight jumps
+        """
+        sx, sy = np.sign(dx), np.sign(dy)
+        jump = ((np.abs(dx) == 2) & (dy == 0)) | ((dx == 0) & (np.abs(dy) == 2))
+        facing = (tx == ox + sx) & (ty == oy + sy)
+        way = direction(sx, sy)
+        return jump & facing & ~own_blocked[self._rows, way] & ~other_blocked[self._rows, way]
+
+    def diagonal_moves(self, dx, dy, ox, oy, tx, ty, own_blocked, other_blocked):
+        """
+        Takes the move offsets, both pawns' x and y, and both pawns' blocked
+        edges, returns which moves are legal diagonal moves around the other
+        pawn, with the other pawn either beside or above/below the mover
+        """
+        rows = self._rows
+        diagonal = (np.abs(dx) == 1) & (np.abs(dy) == 1)
+        across = direction(dx, 0 * dy)
+        along = direction(0 * dx, dy)
+        beside = (tx == ox + dx) & (ty == oy) & ~own_blocked[rows, across] \
+            & other_blocked[rows, across] & ~other_blocked[rows, along]
+        ahead = (tx == ox) & (ty == oy + dy) & ~own_blocked[rows, along] \
+            & other_blocked[rows, along] & ~other_blocked[rows, across]
+        return diagonal & (beside | ahead)
+
+    def place_fences(self, players, directions, positions):
+        """
+        Takes an array with the player placing the fence in each game, an array of
+        'h' / 'v' directions, and an (n, 2) array of (x, y) positions, places every
+        legal fence and returns an array of ILLEGAL, PLACED, or UNFAIR codes matching
+        what QuoridorGame.place_fence would have returned
+        """
+        players = np.asarray(players)
+        directions = np.asarray(directions)
+        x, y = np.asarray(positions)[:, 0], np.asarray(positions)[:, 1]
+        horizontal, vertical = self.open_slots(players, directions, x, y)
+        candidates = self._rows[horizontal | vertical]
+        self._h[self._rows[horizontal], y[horizontal], x[horizontal]] = True
+        self._v[self._rows[vertical], y[vertical], x[vertical]] = True
+        fair = self.opponent_can_reach(candidates, players[candidates])
+        self.undo_unfair(candidates[~fair], horizontal, vertical, x, y)
+        placed = candidates[fair]
+        mover = players[placed] - 1
+        self._fences[placed, mover] -= 1
+        self._turn[placed] = 2 - mover
+        results = np.full(len(self), ILLEGAL, dtype=np.int8)
+        results[candidates] = np.where(fair, PLACED, UNFAIR)
+        return results
+
+    def open_slots(self, players, directions, x, y):
+        """
+        Takes the players, directions, and fence x and y, returns two boolean arrays
+        telling which games have a legal horizontal or vertical fence before fair
+        play is checked: in turn, not won, fences left, on the board, and empty slot
+        """
+        mover = np.clip(players, 1, 2) - 1
+        ok = (players == self._turn) & (self._winner == 0) & (self._fences[self._rows, mover] > 0)
+        size = self._size
+        cx, cy = np.clip(x, 0, size - 1), np.clip(y, 0, size - 1)
+        horizontal = ok & (directions == 'h') & (x >= 0) & (x < size) & (y >= 1) & (y < size)
+        vertical = ok & (directions == 'v') & (x >= 1) & (x < size) & (y >= 0) & (y < size)
+        horizontal &= ~self._h[self._rows, cy, cx]
+        vertical &= ~self._v[self._rows, cy, cx]
+        return horizontal, vertical
+
+    def undo_unfair(self, rows, horizontal, vertical, x, y):
+        """
+        Takes the games whose new fence broke the fair play rule, the masks of
+        horizontal and vertical fences placed, and the fence x and y, takes
+        those fences back off the board
+        """
+        h_rows = rows[horizontal[rows]]
+        v_rows = rows[vertical[rows]]
+        self._h[h_rows, y[h_rows], x[h_rows]] = False
+        self._v[v_rows, y[v_rows], x[v_rows]] = False
+
+    def opponent_can_reach(self, rows, players):
+        """
+        Takes some game numbers and the player who just placed a fence in each,
+        returns a boolean array telling whether the opponent can still reach
+        their goal row in each of those games
+        """
+        opponents = 2 - players
+        last = self._size - 1
+        distances = batch_distances(self._h[rows], self._v[rows], last - last * opponents)
+        tiles = self._pawns[rows, opponents]
+        unreachable = np.iinfo(distances.dtype).max
+        return distances[np.arange(len(rows)), tiles // self._size, tiles % self._size] != unreachable
+
+    def distance_maps(self, player):
+        """
+        Takes player, returns an (n, 9, 9) array with the number of steps from every
+        tile of every game to that player's goal row, UNREACHABLE where fenced off
+        """
+        return batch_distances(self._h, self._v, np.full(len(self), self._size - 1 if player == 1 else 0))
+
+
+def direction(dx, dy):
+    """
+    Takes arrays of unit x and y offsets, returns the matching edge
+    index: 0 up, 1 down, 2 left, 3 right
+    """
+    return np.where(dy < 0, 0, np.where(dy > 0, 1, np.where(dx < 0, 2, 3)))
+
+
+def batch_distances(h, v, goal_rows):
+    """
+    Takes stacks of horizontal and vertical fence planes and each game's goal row,
+    returns an (n, 9, 9) array of distances to the goal row (UNREACHABLE where
+    fenced off). Runs one breadth first search over every game at once, growing
+    the frontier a step at a time until no game has anywhere left to go. Boards of
+    more than 254 tiles get 16-bit distances, with 65535 for fenced off tiles
+    """
+    n, size = len(goal_rows), h.shape[2]
+    dtype = np.uint8 if size * size < 255 else np.uint16
+    unreachable = np.iinfo(dtype).max
+    distances = np.full((n, size, size), unreachable, dtype=dtype)
+    distances[np.arange(n), goal_rows, :] = 0
+    up_open, left_open = ~h[:, 1:size, :], ~v[:, :, 1:size]
+    frontier = distances == 0
+    step = 0
+    while frontier.any():
+        step += 1
+        reached = np.zeros_like(frontier)
+        reached[:, :-1, :] |= frontier[:, 1:, :] & up_open
+        reached[:, 1:, :] |= frontier[:, :-1, :] & up_open
+        reached[:, :, :-1] |= frontier[:, :, 1:] & left_open
+        reached[:, :, 1:] |= frontier[:, :, :-1] & left_open
+        frontier = reached & (distances == unreachable)
+        distances[frontier] = step
+    return distances
@@ -0,0 +1,387 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Benchmark suite for QuoridorGame. Times pawn move checks, jumps, fence placement, the fair
+# play rule in dense fence mazes, whole game replay, and search on positions built from a fixed seed, and
+# reports ops/sec and memory use. Results can be saved as a JSON baseline and compared against later. The
+# memory each game takes and how fence placement scales with the size of the board can be measured too.
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import Quoridor
+from Quoridor import FENCE_SLOTS, QuoridorGame, board_for, build_distances
+from positions import jump_snapshot, maze_snapshot, random_game
+from record import play_move
+from search import Searcher
+
+SEED = 20211101
+REPEATS = 5                      # each workload is timed this many times and the best run is kept
+THRESHOLD = 0.15                 # fraction of a baseline's ops/sec a workload may lose before it fails
+GAMES = 10000                    # games held at once to measure the memory each one takes
+SIZES = (5, 9, 15, 25, 41)       # board sizes for the placement scaling benchmark
+
+
+def illegal_pawn_moves(snapshot):
+    """
+    Takes a snapshot, returns the targets within two tiles of the pawn to move that
+    move_pawn turns down, so checking them never changes the game
+    """
+    game = QuoridorGame.from_snapshot(snapshot)
+    x, y = game.get_pawn(game.get_turn())
+    legal = set(game.legal_pawn_moves())
+    return [(x + dx, y + dy) for dx in range(-2, 3) for dy in range(-2, 3) if (x + dx, y + dy) not in legal]
+
+
+def setup_move_pawn(rng):
+    """
+    Takes a random generator, returns (ops, run) for checking pawn moves that are
+    turned down, in positions from random games
+    """
+    cases = []
+    for count in range(0, 20):
+        for snapshot in random_game(rng)[1][::4]:
+            game = QuoridorGame.from_snapshot(snapshot)
+            cases.extend((game, game.get_turn(), target) for target in illegal_pawn_moves(snapshot))
+
+    def run():
+        for game, turn, target in cases:
+            game.move_pawn(turn, target)
+    return len(cases), run
+
+
+def setup_jumps(rng):
+    """
+    Takes a random generator, returns (ops, run) for trying every move within two
+    tiles of the pawn in face to face positions, on a clone of the game each time
+    """
+    cases = []
+    for count in range(0, 200):
+        game = QuoridorGame.from_snapshot(jump_snapshot(rng))
+        x, y = game.get_pawn(game.get_turn())
+        cases.extend((game, game.get_turn(), (x + dx, y + dy)) for dx in range(-2, 3) for dy in range(-2, 3))
+
+    def run():
+        for game, turn, target in cases:
+            game.clone().move_pawn(turn, target)
+    return len(cases), run
+
+
+def setup_place_fence(rng):
+    """
+    Takes a random generator, returns (ops, run) for placing random fences in
+    positions from random games, on a clone of the game each time
+    """
+    cases = []
+    for count in range(0, 20):
+        for snapshot in random_game(rng)[1][::4]:
+            game = QuoridorGame.from_snapshot(snapshot)
+            for slot in rng.sample(FENCE_SLOTS, 20):
+                cases.append((game, game.get_turn(), slot[0], slot[1]))
+
+    def run():
+        for game, turn, direction, position in cases:
+            game.clone().place_fence(turn, direction, position)
+    return len(cases), run
+
+
+def setup_fair_play_maze(rng):
+    """
+    Takes a random generator, returns (ops, run) for placing a fence in every open
+    slot of dense fence mazes, where nearly every fence cuts a path and the fair
+    play rule has to search the whole maze, on a clone of the game each time
+    """
+    cases = []
+    for count in range(0, 10):
+        game = QuoridorGame.from_snapshot(maze_snapshot(rng))
+        game.distance_map(1)
+        game.distance_map(2)
+        h_walls, v_walls = game.snapshot()[0:2]
+        for direction, position, h_bit, v_bit, tile_a, tile_b in FENCE_SLOTS:
+            if not (h_walls & h_bit or v_walls & v_bit):
+                cases.append((game, direction, position))
+
+    def run():
+        for game, direction, position in cases:
+            game.clone().place_fence(1, direction, position)
+    return len(cases), run
+
+
+def setup_distances_maze(rng):
+    """
+    Takes a random generator, returns (ops, run) for building distance maps from
+    scratch on dense fence mazes
+    """
+    walls = [maze_snapshot(rng)[0:2] for count in range(0, 300)]
+
+    def run():
+        for h_walls, v_walls in walls:
+            build_distances(h_walls, v_walls, 8)
+            build_distances(h_walls, v_walls, 0)
+    return 2 * len(walls), run
+
+
+def setup_cached_maps(rng):
+    """
+    Takes a random generator, returns (ops, run) for loading every position of
+    random games from a snapshot and getting both distance maps, counting maps.
+    Positions that share a fence layout share a map through the distance cache, so
+    comparing with --cache-bytes 0 shows what the cache saves
+    """
+    snapshots = [snapshot for count in range(0, 30) for snapshot in random_game(rng)[1]]
+
+    def run():
+        for snapshot in snapshots:
+            game = QuoridorGame.from_snapshot(snapshot)
+            game.distance_map(1)
+            game.distance_map(2)
+    return 2 * len(snapshots), run
+
+
+def setup_replay(rng):
+    """
+    Takes a random generator, returns (ops, run) for replaying random legal games
+    from the start through move_pawn and place_fence, counting moves
+    """
+    games = [random_game(rng)[0] for count in range(0, 30)]
+
+    def run():
+        for moves in games:
+            game = QuoridorGame()
+            for move in moves:
+                play_move(game, move)
+    return sum(len(moves) for moves in games), run
+
+
+def setup_main(rng):
+    """
+    Takes a random generator, returns (ops, run) for playing the scripted game in
+    Quoridor.main (its printing goes nowhere), counting games
+    """
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for count in range(0, 20):
+                Quoridor.main()
+    return 20, run
+
+
+def setup_search(rng):
+    """
+    Takes a random generator, returns (ops, run) for depth 2 alpha-beta searches
+    of positions from random games with a new Searcher each time, counting nodes
+    """
+    games = [QuoridorGame.from_snapshot(random_game(rng)[1][10]) for count in range(0, 5)]
+
+    def run():
+        nodes = 0
+        for game in games:
+            nodes += Searcher(1 << 12, book=False).search(game, 600000, 2).nodes
+        return nodes
+    return run(), run
+
+
+WORKLOADS = {'move_pawn': setup_move_pawn, 'jumps': setup_jumps, 'place_fence': setup_place_fence,
+             'fair_play_maze': setup_fair_play_maze, 'distances_maze': setup_distances_maze,
+             'cached_maps': setup_cached_maps, 'replay': setup_replay, 'main_game': setup_main, 'search': setup_search}
+
+
+def measure(ops, run, repeats=REPEATS):
+    """
+    Takes the ops in a workload, the function that runs it, and the number of
+    repeats, times the workload and returns the best ops per second. The shared
+    distance map cache is emptied before every run, so a run can't just replay
+    the maps the run before it cached
+    """
+    best = None
+    for count in range(0, repeats):
+        Quoridor.DISTANCE_CACHE.clear()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return ops / best if best > 0 else 0.0
+
+
+def measure_memory(ops, run):
+    """
+    Takes the ops in a workload and the function that runs it, runs it once with
+    tracemalloc on and returns (the most memory in bytes it had allocated at once,
+    the bytes per op it left allocated). The distance map cache is emptied first
+    """
+    Quoridor.DISTANCE_CACHE.clear()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - start, (current - start) / ops
+
+
+def game_memory(rng, count=GAMES):
+    """
+    Takes a random generator and a number of games, returns (bytes per game just
+    loaded from a snapshot, bytes per game once it has built its distance maps and a
+    fence has been placed), measured with tracemalloc over count games held at once
+    in positions from random games
+    """
+    snapshots = []
+    while len(snapshots) < count:
+        snapshots.extend(snapshot for snapshot in random_game(rng)[1] if snapshot[5] and snapshot[6])
+    snapshots = snapshots[:count]
+    fences = [rng.choice(QuoridorGame.from_snapshot(snapshot).legal_fences()) for snapshot in snapshots]
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        games = [QuoridorGame.from_snapshot(snapshot) for snapshot in snapshots]
+        loaded = tracemalloc.get_traced_memory()[0] - start
+        for game, move in zip(games, fences):
+            game.distance_map(1)
+            game.distance_map(2)
+            play_move(game, move)
+        played = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return loaded / count, played / count
+
+
+def fenced_board(rng, size):
+    """
+    Takes a random generator and a board size, returns a game on that board where
+    both players have placed random legal fences into about a third of the slots,
+    with its distance maps built
+    """
+    slots = board_for(size).fence_slots
+    game = QuoridorGame(size, len(slots))
+    for slot in rng.sample(slots, len(slots) // 3):
+        game.place_fence(game.get_turn(), slot[0], slot[1])
+    game.distance_map(1)
+    game.distance_map(2)
+    return game
+
+
+def placement_scaling(rng, sizes=SIZES, count=200):
+    """
+    Takes a random generator, board sizes, and a number of fences, returns a list of
+    (size, microseconds per place_fence, milliseconds per legal_fences) for each size,
+    placing count random fences into open slots of a fenced board, on a clone each time
+    """
+    rows = []
+    for size in sizes:
+        game = fenced_board(rng, size)
+        h_walls, v_walls = game.snapshot()[0:2]
+        open_slots = [slot for slot in board_for(size).fence_slots if not (h_walls & slot[2] or v_walls & slot[3])]
+        cases = [rng.choice(open_slots) for index in range(0, count)]
+        turn = game.get_turn()
+
+        def run():
+            for slot in cases:
+                game.clone().place_fence(turn, slot[0], slot[1])
+        placement = 1e6 / measure(count, run)
+        generation = 1e3 / measure(1, game.legal_fences)
+        rows.append((size, placement, generation))
+    return rows
+
+
+def run_suite(names, seed=SEED, repeats=REPEATS):
+    """
+    Takes the names of workloads to run, a seed, and the repeats, returns a
+    dictionary of results by name, each holding the ops, ops per second, peak
+    bytes, and bytes left allocated per op
+    """
+    results = {}
+    for name in names:
+        ops, run = WORKLOADS[name](random.Random(seed))
+        run()                                       # warm up caches before timing
+        rate = measure(ops, run, repeats)
+        peak, retained = measure_memory(ops, run)
+        results[name] = {'ops': ops, 'ops_per_sec': round(rate, 1), 'peak_bytes': peak,
+                         'retained_bytes_per_op': round(retained, 2)}
+    return results
+
+
+def regressions(results, baseline, threshold=THRESHOLD):
+    """
+    Takes results, a baseline of earlier results, and the threshold, returns a
+    list of (name, baseline ops/sec, ops/sec) for workloads that got slower than
+    the baseline by more than the threshold
+    """
+    slower = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before and result['ops_per_sec'] < before['ops_per_sec'] * (1 - threshold):
+            slower.append((name, before['ops_per_sec'], result['ops_per_sec']))
+    return slower
+
+
+def report(results, baseline):
+    """
+    Takes results and a baseline (or None), prints a table of the results
+    with the change from the baseline where there is one
+    """
+    print('%-16s %8s %12s %10s %12s %8s' % ('workload', 'ops', 'ops/sec', 'peak KiB', 'kept B/op', 'change'))
+    for name, result in results.items():
+        before = (baseline or {}).get('results', {}).get(name)
+        change = '%+.1f%%' % (100 * (result['ops_per_sec'] / before['ops_per_sec'] - 1)) if before else ''
+        print('%-16s %8d %12.0f %10.1f %12.2f %8s' % (name, result['ops'], result['ops_per_sec'],
+                                                     result['peak_bytes'] / 1024,
+                                                     result['retained_bytes_per_op'], change))
+
+
+def main():
+    # python bench.py --save baseline.json, then later python bench.py --compare baseline.json
+    parser = argparse.ArgumentParser(description='Benchmark QuoridorGame.')
+    parser.add_argument('workloads', nargs='*', help='workloads to run (default: all): ' + ', '.join(WORKLOADS))
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--save', help='write the results to this JSON file as a baseline')
+    parser.add_argument('--compare', help='JSON baseline to compare against')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='fail if ops/sec drops by more than this fraction (default %(default)s)')
+    parser.add_argument('--games', type=int, default=0,
+                        help='measure the bytes each game takes with this many held at once, then stop')
+    parser.add_argument('--sizes', help='comma separated board sizes to time fence placement on, then stop')
+    parser.add_argument('--cache-bytes', type=int, default=Quoridor.DISTANCE_CACHE_BYTES,
+                        help='memory cap of the shared distance map cache, 0 to turn it off')
+    args = parser.parse_args()
+    Quoridor.DISTANCE_CACHE.set_limit(args.cache_bytes)
+    if args.sizes:
+        print('%6s %16s %20s' % ('size', 'place_fence us', 'legal_fences ms'))
+        for size, placement, generation in placement_scaling(random.Random(args.seed),
+                                                             [int(size) for size in args.sizes.split(',')]):
+            print('%6d %16.1f %20.2f' % (size, placement, generation))
+        return 0
+    if args.games:
+        loaded, played = game_memory(random.Random(args.seed), args.games)
+        print('bytes per game: %.0f loaded from a snapshot, %.0f with distance maps after a fence' % (loaded, played))
+        return 0
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        parser.error('unknown workloads: ' + ', '.join(unknown))
+    results = run_suite(args.workloads or list(WORKLOADS), args.seed, args.repeats)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    report(results, baseline)
+    print('distance cache in the last run: %(hits)d hits, %(misses)d misses, %(evictions)d evictions, '
+          '%(entries)d entries in %(bytes)d bytes' % Quoridor.DISTANCE_CACHE.get_stats())
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump({'python': platform.python_version(), 'seed': args.seed, 'results': results},
+                      baseline_file, indent=2)
+    slower = regressions(results, baseline, args.threshold) if baseline else []
+    for name, before, after in slower:
+        print('REGRESSION: %s fell from %.0f to %.0f ops/sec' % (name, before, after))
+    return 1 if slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
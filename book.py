@@ -0,0 +1,213 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Opening book for Quoridor. build_book searches the positions near the start offline (on a pool
+# of worker processes) and writes each position's Zobrist hash and best move into a file sorted by hash.
+# OpeningBook memory-maps the file and binary searches it, so every process that opens the same book shares
+# the pages the operating system already holds instead of loading the book into its own heap.
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Quoridor import QuoridorGame
+from record import decode_move, encode_move, from_notation, to_notation
+from search import Searcher
+
+BOOK_MAGIC = b'QOB1'                   # first bytes of every book file
+BOOK_HEADER = struct.Struct('<4sBBI')  # magic, board size, starting fences, number of entries
+ENTRY = struct.Struct('<QH')           # Zobrist hash, move code
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening.book')
+
+_books = {}                            # (file version, OpeningBook or None if unreadable) by path
+
+
+class OpeningBook:
+    """
+    This represents an opening book file opened read only through mmap. Entries are
+    (hash, move code) pairs sorted by hash, found by binary search straight from
+    the mapped pages. A book only answers for games of the board size and fence
+    count it was built for, and a move is only given if it is legal in the game,
+    so a hash collision can't play an illegal move
+    """
+
+    def __init__(self, path):
+        """
+        Takes the path of a book file, checks the header and maps the file, raises
+        ValueError if the file isn't an opening book (empty, cut short, or another format)
+        """
+        with open(path, 'rb') as file:
+            header = file.read(BOOK_HEADER.size)
+            if len(header) < BOOK_HEADER.size:
+                raise ValueError(path + ' is not an opening book')
+            magic, self._size, self._fences, self._count = BOOK_HEADER.unpack(header)
+            length = os.fstat(file.fileno()).st_size
+            if magic != BOOK_MAGIC or length != BOOK_HEADER.size + self._count * ENTRY.size:
+                raise ValueError(path + ' is not an opening book')
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        """
+        Unmaps the book file
+        """
+        self._map.close()
+
+    def lookup(self, key):
+        """
+        Takes a Zobrist hash, returns the move code stored for it, or None
+        """
+        low = 0
+        high = self._count
+        while low < high:
+            middle = (low + high) // 2
+            found, code = ENTRY.unpack_from(self._map, BOOK_HEADER.size + middle * ENTRY.size)
+            if found == key:
+                return code
+            if found < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def probe(self, game):
+        """
+        Takes game, returns the book move for whoever's turn it is, or None if the
+        position isn't in the book, the book is for another board, or the stored
+        move isn't legal in the game
+        """
+        if game.get_size() != self._size or game.get_start_fences() != self._fences:
+            return None
+        code = self.lookup(game.zobrist_hash())
+        if code is None:
+            return None
+        move = decode_move(code, self._size)
+        if move[0] == 'p':
+            return move if move[1] in game.legal_pawn_moves() else None
+        return move if game.fence_allowed(move[0], move[1]) else None
+
+
+def load_book(path=BOOK_PATH):
+    """
+    Takes the path of a book file, returns the OpeningBook for it, or None if there is
+    no book at that path right now or the file can't be read as one. A book is opened
+    once per process and reused until the file is replaced (a new inode, size, or
+    modification time), so a book built or rebuilt while a process runs is picked up
+    on its next search. A file that isn't a book is remembered the same way, so
+    searches go on without a book rather than failing on it
+    """
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+    version = (status.st_ino, status.st_size, status.st_mtime_ns)
+    if path not in _books or _books[path][0] != version:
+        try:
+            _books[path] = (version, OpeningBook(path))
+        except (OSError, ValueError):
+            _books[path] = (version, None)
+    return _books[path][1]
+
+
+def book_move(snapshot, size, fences, time_ms, width):
+    """
+    Takes a snapshot, the board size and fences, time_ms, and width, runs in a worker
+    process and returns (best move, moves to follow): the move a search of time_ms
+    milliseconds finds, and the best move followed by the next width - 1 moves in
+    the search's move order
+    """
+    game = QuoridorGame.from_snapshot(snapshot, size, fences)
+    searcher = Searcher(1 << 16, book=False)
+    move = searcher.search(game, time_ms).move
+    if move is None:
+        return None, []
+    others = [other for other in searcher.ordered_moves(game, 0, None) if other != move]
+    return move, [move] + others[:width - 1]
+
+
+def build_book(path, plies=4, width=3, time_ms=500, workers=1, size=9, fences=10):
+    """
+    Takes the path to write to, the number of plies from the start to cover, the
+    number of moves to follow from each position, time_ms per search, the number of
+    worker processes, and the board size and fences. Searches every position
+    reached, writes the book, and returns the number of entries
+    """
+    entries = {}
+    level = [QuoridorGame(size, fences)]
+    with ProcessPoolExecutor(workers) as pool:
+        for ply in range(0, plies):
+            level = [game for game in level if game.zobrist_hash() not in entries and game.get_winner() is None]
+            results = pool.map(book_move, [game.snapshot() for game in level], [size] * len(level),
+                               [fences] * len(level), [time_ms] * len(level), [width] * len(level))
+            level = expand_level(level, results, entries, size)
+    write_book(path, entries, size, fences)
+    return len(entries)
+
+
+def expand_level(level, results, entries, size):
+    """
+    Takes the games of one ply, their book_move results, the entries so far, and the
+    board size, adds each game's best move to the entries and returns the games of
+    the next ply, one for each move followed and each position only once
+    """
+    following = {}
+    for game, (move, moves) in zip(level, results):
+        if move is None:
+            continue
+        entries[game.zobrist_hash()] = encode_move(move, size)
+        for followed in moves:
+            child = game.clone()
+            child.make_move(followed)
+            following.setdefault(child.zobrist_hash(), child)
+    return list(following.values())
+
+
+def write_book(path, entries, size, fences):
+    """
+    Takes the path, a dictionary of hash to move code, and the board size and fences,
+    writes the book sorted by hash. The file is written beside the old one and then
+    moved over it, so a process that has the old book mapped keeps a whole file
+    """
+    data = bytearray(BOOK_HEADER.pack(BOOK_MAGIC, size, fences, len(entries)))
+    for key in sorted(entries):
+        data += ENTRY.pack(key, entries[key])
+    with open(path + '.tmp', 'wb') as file:
+        file.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def main():
+    # python book.py build --plies 4 --width 3 --ms 500 --workers 8, then python book.py probe e2 e8
+    parser = argparse.ArgumentParser(description='Build or probe a Quoridor opening book.')
+    parser.add_argument('command', choices=['build', 'probe'])
+    parser.add_argument('moves', nargs='*', help='moves in notation from the start, for probe')
+    parser.add_argument('--book', default=BOOK_PATH)
+    parser.add_argument('--plies', type=int, default=4)
+    parser.add_argument('--width', type=int, default=3, help='moves followed from each position')
+    parser.add_argument('--ms', type=int, default=500, help='milliseconds searched per position')
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    if args.command == 'build':
+        start = time.perf_counter()
+        count = build_book(args.book, args.plies, args.width, args.ms, args.workers)
+        print(count, 'positions in %.1f sec' % (time.perf_counter() - start))
+        return 0
+    book = load_book(args.book)
+    if book is None:
+        print('no book at', args.book)
+        return 1
+    game = QuoridorGame()
+    for text in args.moves:
+        game.make_move(from_notation(text))
+    move = book.probe(game)
+    print(to_notation(move) if move is not None else 'not in book', '(%d positions)' % len(book))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Encodes Quoridor positions as stacks of planes for training and running neural networks. A batch
+# of snapshots is written straight into a preallocated NumPy array, and write_shards streams the positions of
+# game record archives into fixed-size shard files along with the move played and the game's outcome. Distances
+# come from batch_distances over the whole batch, so encoding never touches the engine's distance cache.
+# Requires NumPy.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from batch import batch_distances
+from Quoridor import board_for
+from record import encode_move, read_archive
+
+PLANES = 9                 # planes per position, in the order below
+P1_PAWN = 0                # 1 on the tile of player 1's pawn
+P2_PAWN = 1                # 1 on the tile of player 2's pawn
+H_FENCES = 2               # 1 on tiles with a placed fence on the edge above them
+V_FENCES = 3               # 1 on tiles with a placed fence on the edge left of them
+P1_DISTANCE = 4            # steps to player 1's goal row over the number of tiles, 1 where fenced off
+P2_DISTANCE = 5            # steps to player 2's goal row, the same way
+P1_FENCES = 6              # player 1's fences left over the starting fences, on every tile
+P2_FENCES = 7              # player 2's fences left, the same way
+TO_MOVE = 8                # 1 on every tile when it is player 1's turn, 0 for player 2
+SHARD_SIZE = 65536         # positions in each shard file, except the last
+WORD_MASK = (1 << 64) - 1  # one 64-bit word of a fence bitmask
+
+
+class PositionEncoder:
+    """
+    This represents an encoder of positions on one size of board into arrays of shape
+    (n, PLANES, size, size) of a floating point dtype. Snapshots are encoded a whole
+    batch at a time: the fence bitmasks of the batch are split into 64-bit words and
+    unpacked together, the distance planes come from one batch_distances search over
+    the fence planes, and every plane is filled with one NumPy operation for the whole
+    batch straight into the array given. Games can also be encoded move by move in
+    place (see start_position and play), which is how records are turned into shards
+    """
+
+    def __init__(self, size=9, fences=10, dtype=np.float32):
+        """
+        Takes the board size, the starting fences, and the dtype of the planes,
+        initializes the tables for unpacking fence bitmasks. Raises ValueError if
+        the dtype isn't a floating point type, as the planes hold fractions
+        """
+        if not np.issubdtype(dtype, np.floating):
+            raise ValueError('dtype must be a floating point type, not %s' % np.dtype(dtype))
+        self._board = board_for(size, fences)
+        self._dtype = dtype
+        self._words = (size * (size + 1) + 63) // 64
+        self._h_bits = np.arange(0, size * size)
+        self._v_bits = np.array([y * (size + 1) + x for y in range(0, size) for x in range(0, size)])
+
+    def get_board(self):
+        """
+        Returns (board size, starting fences) of the positions encoded
+        """
+        return self._board.size, self._board.fences
+
+    def new_batch(self, n):
+        """
+        Takes n, returns a zeroed array that can hold n encoded positions
+        """
+        size = self._board.size
+        return np.zeros((n, PLANES, size, size), dtype=self._dtype)
+
+    def encode(self, snapshots, out):
+        """
+        Takes a list of QuoridorGame snapshots and a C-contiguous floating point array of
+        shape (at least len(snapshots), PLANES, size, size), such as one from new_batch or
+        an ndarray made over a shared memory buffer, writes the positions into the first
+        rows of the array and returns that part of it. Raises ValueError if the array
+        has the wrong shape, layout, or dtype
+        """
+        n = len(snapshots)
+        board = self._board
+        if (out.shape[1:] != (PLANES, board.size, board.size) or len(out) < n or not out.flags.c_contiguous
+                or not np.issubdtype(out.dtype, np.floating)):
+            raise ValueError('out must be a C-contiguous floating point array of shape (%d or more, %d, %d, %d)'
+                             % (n, PLANES, board.size, board.size))
+        planes = out[:n].reshape(n, PLANES, board.tiles)
+        h_walls, v_walls, p1, p2, turn, p1_fences, p2_fences, winner = zip(*snapshots) if n else [()] * 8
+        self.encode_pawns(planes, p1, p2)
+        planes[:, H_FENCES] = self.unpack(h_walls, board.h_border, self._h_bits)
+        planes[:, V_FENCES] = self.unpack(v_walls, board.v_border, self._v_bits)
+        start = max(board.fences, 1)
+        planes[:, P1_FENCES] = np.array(p1_fences, dtype=out.dtype)[:, None] / start
+        planes[:, P2_FENCES] = np.array(p2_fences, dtype=out.dtype)[:, None] / start
+        planes[:, TO_MOVE] = (np.array(turn) == 1)[:, None]
+        self.encode_distances(out[:n])
+        return out[:n]
+
+    def encode_pawns(self, planes, p1, p2):
+        """
+        Takes the (n, PLANES, tiles) view of the output and the
+        tiles of each player's pawn, fills in the pawn planes
+        """
+        rows = np.arange(0, len(planes))
+        planes[:, P1_PAWN:P2_PAWN + 1] = 0
+        planes[rows, P1_PAWN, np.array(p1, dtype=np.intp)] = 1
+        planes[rows, P2_PAWN, np.array(p2, dtype=np.intp)] = 1
+
+    def unpack(self, walls, border, bits):
+        """
+        Takes a fence bitmask from each position, the bits of the edges of the board,
+        and the bit under each tile, returns an (n, tiles) array of the placed fences.
+        The bitmasks go through one object array, a 64-bit word of every position at a time
+        """
+        masks = np.array(walls, dtype=object) & ~border
+        words = np.empty((len(walls), self._words), dtype='<u8')
+        for word in range(0, self._words):
+            words[:, word] = masks >> (64 * word) & WORD_MASK
+        return np.unpackbits(words.view(np.uint8), axis=1, bitorder='little')[:, bits]
+
+    def encode_distances(self, out):
+        """
+        Takes encoded positions whose fence planes are filled in, fills in both
+        distance planes: steps to the goal row over the number of tiles, with 1 for
+        tiles fenced off from it. Positions in a batch mostly share fence layouts, so
+        each layout is searched once, all of them together with batch_distances
+        """
+        board = self._board
+        size = board.size
+        h = np.ones((len(out), size + 1, size), dtype=bool)
+        h[:, 1:size] = out[:, H_FENCES, 1:] != 0
+        v = np.ones((len(out), size, size + 1), dtype=bool)
+        v[:, :, 1:size] = out[:, V_FENCES, :, 1:] != 0
+        edges = board.tiles + size
+        fences = np.concatenate((h.reshape(len(out), edges), v.reshape(len(out), edges)), axis=1)
+        keys = np.packbits(fences, axis=1)
+        keys = keys.view(np.dtype((np.void, keys.shape[1]))).ravel()
+        first, layout_of = np.unique(keys, return_index=True, return_inverse=True)[1:]
+        for plane, goal in ((P1_DISTANCE, size - 1), (P2_DISTANCE, 0)):
+            maps = batch_distances(h[first], v[first], np.full(len(first), goal))
+            maps = np.where(maps == np.iinfo(maps.dtype).max, board.tiles, maps) / board.tiles
+            out[:, plane] = maps[layout_of.ravel()]
+
+    def start_position(self, row):
+        """
+        Takes one (PLANES, size, size) row, writes the starting position into
+        it, all but the distance planes (see encode_distances)
+        """
+        board = self._board
+        row.fill(0)
+        for plane, tile in zip((P1_PAWN, P2_PAWN), board.start):
+            row[plane, tile // board.size, tile % board.size] = 1
+        row[P1_FENCES:P2_FENCES + 1] = 1 if board.fences else 0
+        row[TO_MOVE] = 1
+
+    def play(self, row, turn, move, fences_left):
+        """
+        Takes a row holding the position before a move (as start_position leaves it), the
+        player moving, the move, and the fences that player has left after it, updates
+        the row in place to the position after the move. The move isn't checked
+        """
+        kind, (x, y) = move
+        if kind == 'p':
+            pawn = row[P1_PAWN if turn == 1 else P2_PAWN]
+            pawn.fill(0)
+            pawn[y, x] = 1
+        else:
+            row[H_FENCES if kind == 'h' else V_FENCES, y, x] = 1
+            row[P1_FENCES if turn == 1 else P2_FENCES] = fences_left / max(self._board.fences, 1)
+        row[TO_MOVE] = turn == 2
+
+
+def record_positions(paths, encoder, row):
+    """
+    Takes archive paths, an encoder, and one (PLANES, size, size) row, and for the
+    position before every move of every record on the encoder's board, writes the
+    position into the row (all but the distance planes) and yields (move code, value):
+    the move played and 1 if the player to move went on to win, -1 if they lost, 0 if
+    the record has no winner. Records on other boards are skipped
+    """
+    size, fences = encoder.get_board()
+    for path in paths:
+        for record in read_archive(path):
+            if record.get_board() != (size, fences):
+                continue
+            encoder.start_position(row)
+            left = [fences, fences]
+            turn = 1
+            winner = record.get_winner()
+            for move in record.get_moves():
+                yield encode_move(move, size), 0 if not winner else 1 if winner == turn else -1
+                if move[0] != 'p':
+                    left[turn - 1] -= 1
+                encoder.play(row, turn, move, left[turn - 1])
+                turn = 3 - turn
+
+
+def write_shards(paths, directory, shard_size=SHARD_SIZE, size=9, fences=10):
+    """
+    Takes archive paths, a directory, positions per shard, and a board size and starting
+    fences, streams the positions of the archives into shard files in the directory,
+    and yields (path, positions) as each one is written. Each shard is an .npz file
+    holding planes, moves (the move code played), and values (see record_positions),
+    and every shard but the last holds shard_size positions. Positions are played into
+    one row and copied into the shard's arrays, which are made once and reused, so
+    memory stays the same however many archives there are
+    """
+    os.makedirs(directory, exist_ok=True)
+    encoder = PositionEncoder(size, fences)
+    planes = encoder.new_batch(shard_size)
+    moves = np.zeros(shard_size, dtype=np.uint16)
+    values = np.zeros(shard_size, dtype=np.int8)
+    row = encoder.new_batch(1)[0]
+    count = 0
+    shards = 0
+    for code, value in record_positions(paths, encoder, row):
+        planes[count] = row
+        moves[count] = code
+        values[count] = value
+        count += 1
+        if count == shard_size:
+            yield save_shard(os.path.join(directory, 'shard_%05d.npz' % shards), encoder, planes, moves, values,
+                             count)
+            shards += 1
+            count = 0
+    if count:
+        yield save_shard(os.path.join(directory, 'shard_%05d.npz' % shards), encoder, planes, moves, values,
+                         count)
+
+
+def save_shard(path, encoder, planes, moves, values, count):
+    """
+    Takes the path of a shard, the encoder, the arrays holding the shard, and the
+    number of positions in it, fills in the distance planes, writes the shard and
+    returns (path, positions)
+    """
+    encoder.encode_distances(planes[:count])
+    np.savez(path, planes=planes[:count], moves=moves[:count], values=values[:count])
+    return path, count
+
+
+def main():
+    # python encode.py games.qra more.qra --out shards --shard-size 65536
+    parser = argparse.ArgumentParser(description='Write game record archives out as training shards.')
+    parser.add_argument('archives', nargs='+')
+    parser.add_argument('--out', default='shards', help='directory to write the shards to')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    parser.add_argument('--size', type=int, default=9, help='board size of the records to use')
+    parser.add_argument('--fences', type=int, default=10, help='starting fences of the records to use')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    total = 0
+    for path, positions in write_shards(args.archives, args.out, args.shard_size, args.size, args.fences):
+        total += positions
+        print(path, positions, 'positions')
+    seconds = time.perf_counter() - start
+    print(total, 'positions in %.1f sec (%.0f/sec)' % (seconds, total / seconds if seconds else 0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
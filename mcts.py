@@ -0,0 +1,298 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Monte Carlo tree search (UCT) engine for QuoridorGame. Playouts mostly follow the shortest
+# path with the odd blocking fence, are played with make_move/unmake_move, and the tree is kept between moves.
+
+import math
+import random
+import time
+from collections import namedtuple
+
+from Quoridor import NO_PATH
+
+MCTSResult = namedtuple('MCTSResult', ['move', 'visits', 'playouts', 'playouts_per_sec', 'elapsed_ms'])
+
+
+class Node:
+    """
+    This represents one position in the search tree: the move that led to it, the
+    player who made that move, the position's Zobrist hash, the moves not yet tried
+    from it, and how many playouts went through it and how many the player who made
+    the move won
+    """
+
+    def __init__(self, move, player, key, parent):
+        """
+        Takes the move into the position, the player who made it, the
+        position's hash, and the parent node, initializes an unvisited node
+        """
+        self._move = move
+        self._player = player
+        self._key = key
+        self._parent = parent
+        self._children = []
+        self._untried = None      # filled in the first time the node is reached
+        self._visits = 0
+        self._wins = 0
+
+    def get_move(self):
+        """
+        Returns the move that led to this position
+        """
+        return self._move
+
+    def get_key(self):
+        """
+        Returns the Zobrist hash of this position
+        """
+        return self._key
+
+    def get_visits(self):
+        """
+        Returns the number of playouts that went through this node
+        """
+        return self._visits
+
+    def detach(self):
+        """
+        Cuts the node off from its parent so it can become the root
+        """
+        self._parent = None
+
+    def fully_expanded(self, game, rng):
+        """
+        Takes the game (in this node's position) and a random generator, returns
+        True if every legal move from here already has a child node
+        """
+        if self._untried is None:
+            self._untried = game.legal_moves()
+            rng.shuffle(self._untried)
+        return not self._untried and bool(self._children)
+
+    def expand(self, game):
+        """
+        Takes the game (in this node's position), plays one untried move on it and
+        returns the new child node, or None if there are no moves to try
+        """
+        if not self._untried:
+            return None
+        move = self._untried.pop()
+        player = game.get_turn()
+        game.make_move(move)
+        child = Node(move, player, game.zobrist_hash(), self)
+        self._children.append(child)
+        return child
+
+    def select(self, exploration):
+        """
+        Takes the exploration constant, returns the child with the highest
+        upper confidence bound (UCT)
+        """
+        scale = exploration * math.sqrt(math.log(self._visits))
+        best = None
+        best_value = -1.0
+        for child in self._children:
+            value = child._wins / child._visits + scale / math.sqrt(child._visits)
+            if value > best_value:
+                best = child
+                best_value = value
+        return best
+
+    def backpropagate(self, winner):
+        """
+        Takes the winner of a playout, adds the playout to this node
+        and every node above it
+        """
+        node = self
+        while node is not None:
+            node._visits += 1
+            if node._player == winner:
+                node._wins += 1
+            node = node._parent
+
+    def nodes_within(self, depth):
+        """
+        Takes depth, returns this node and every node below it
+        that is at most depth moves further down the tree
+        """
+        found = [self]
+        if depth > 0:
+            for child in self._children:
+                found.extend(child.nodes_within(depth - 1))
+        return found
+
+    def most_visited(self):
+        """
+        Returns the child that has been visited the most, or None if there are none
+        """
+        if not self._children:
+            return None
+        return max(self._children, key=lambda child: child._visits)
+
+
+class MonteCarloSearcher:
+    """
+    This represents a Monte Carlo tree search engine. Each iteration walks down the tree
+    choosing children by UCT, adds one new node, and plays the game out from there with a
+    cheap policy: usually the pawn takes a step that shortens its path, sometimes a random
+    step, and now and then a fence goes across the opponent's shortest path. Playouts that
+    run too long are decided by who is closer to their goal. Searching is limited by a
+    number of iterations, a time budget, or both. The tree is kept after a search, and the
+    next search reuses the part below the position it is asked about
+    """
+
+    def __init__(self, exploration=1.4, greedy=0.8, fence_rate=0.1, max_playout=200, seed=None):
+        """
+        Takes the UCT exploration constant, the chance a playout pawn move takes the
+        shortest path, the chance a playout move is a blocking fence, the most plies
+        a playout lasts, and a random seed
+        """
+        self._exploration = exploration
+        self._greedy = greedy
+        self._fence_rate = fence_rate
+        self._max_playout = max_playout
+        self._random = random.Random(seed)
+        self._root = None
+
+    def search(self, game, iterations=None, time_ms=None):
+        """
+        Takes game, a number of iterations, and a time budget in milliseconds (1000
+        iterations if neither is given), searches the position and returns an
+        MCTSResult with the most visited move. The game is left as it was
+        """
+        if iterations is None and time_ms is None:
+            iterations = 1000
+        start = time.perf_counter()
+        deadline = None if time_ms is None else start + time_ms / 1000
+        root = self.find_root(game)
+        count = 0
+        while iterations is None or count < iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self.iterate(root, game)
+            count += 1
+        elapsed = time.perf_counter() - start
+        best = root.most_visited()
+        return MCTSResult(best.get_move() if best else None, root.get_visits(), count,
+                          int(count / elapsed) if elapsed > 0 else 0, elapsed * 1000)
+
+    def find_root(self, game):
+        """
+        Takes game, returns the node for its position from the tree kept from the
+        last search (looking up to two moves below the old root), or a new root
+        """
+        key = game.zobrist_hash()
+        if self._root is not None:
+            for node in self._root.nodes_within(2):
+                if node.get_key() == key:
+                    node.detach()
+                    self._root = node
+                    return node
+        self._root = Node(None, 3 - game.get_turn(), key, None)
+        return self._root
+
+    def iterate(self, root, game):
+        """
+        Takes the root node and game, runs one selection, expansion,
+        playout, and backpropagation, leaving the game as it was
+        """
+        node = root
+        plies = 0
+        while game.get_winner() is None and node.fully_expanded(game, self._random):
+            node = node.select(self._exploration)
+            game.make_move(node.get_move())
+            plies += 1
+        if game.get_winner() is None:
+            child = node.expand(game)
+            if child is not None:
+                node = child
+                plies += 1
+        winner = self.playout(game)
+        for ply in range(0, plies):
+            game.unmake_move()
+        node.backpropagate(winner)
+
+    def playout(self, game):
+        """
+        Takes game, plays it out with the playout policy until someone wins or the
+        playout gets too long, takes the moves back, and returns the winner
+        """
+        plies = 0
+        while game.get_winner() is None and plies < self._max_playout:
+            move = self.playout_move(game)
+            if move is None:
+                break
+            game.make_move(move)
+            plies += 1
+        winner = game.get_winner() or race_winner(game)
+        for ply in range(0, plies):
+            game.unmake_move()
+        return winner
+
+    def playout_move(self, game):
+        """
+        Takes game, returns the playout policy's move for whoever's turn it
+        is, or None if they have no move at all
+        """
+        turn = game.get_turn()
+        if game.get_fences(turn) > 0 and self._random.random() < self._fence_rate:
+            fence = self.blocking_fence(game, turn)
+            if fence is not None:
+                return fence
+        moves = game.legal_pawn_moves()
+        if not moves:
+            return None
+        if self._random.random() < self._greedy:
+            distances = game.distance_map(turn)
+            size = game.get_size()
+            return 'p', min(moves, key=lambda position: distances[position[1] * size + position[0]])
+        return 'p', self._random.choice(moves)
+
+    def blocking_fence(self, game, turn):
+        """
+        Takes game and turn, returns a legal fence across a random step of the
+        opponent's shortest path, or None if the fence picked isn't legal
+        """
+        path = game.shortest_path(3 - turn)
+        if not path:
+            return None
+        index = self._random.randrange(0, len(path))
+        here = path[index - 1] if index > 0 else game.get_pawn(3 - turn)
+        fence = fence_between(here, path[index])
+        if game.fence_allowed(fence[0], fence[1], turn):
+            return fence
+        return None
+
+
+def fence_between(here, there):
+    """
+    Takes two neighboring (x, y) tiles, returns the fence
+    move that would go on the edge between them
+    """
+    if here[0] == there[0]:
+        return 'h', (here[0], max(here[1], there[1]))
+    return 'v', (max(here[0], there[0]), here[1])
+
+
+def race_winner(game):
+    """
+    Takes game, returns the player who wins if both pawns just walk their
+    shortest paths from here, with ties going to whoever moves first
+    """
+    turn = game.get_turn()
+    own = game.distance_to_goal(turn)
+    other = game.distance_to_goal(3 - turn)
+    own = NO_PATH if own is None else own
+    other = NO_PATH if other is None else other
+    return turn if own <= other else 3 - turn
+
+
+def mcts_move(game, iterations=None, time_ms=None, searcher=None):
+    """
+    Takes game, a number of iterations, a time budget in milliseconds, and an
+    optional MonteCarloSearcher to reuse (so its tree carries over between
+    moves), returns the MCTSResult for the position
+    """
+    if searcher is None:
+        searcher = MonteCarloSearcher()
+    return searcher.search(game, iterations, time_ms)
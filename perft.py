@@ -0,0 +1,240 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Move generation checks for QuoridorGame. perft counts every sequence of legal moves to a
+# given depth (with divide output per first move), and cross_check compares the fast move generators
+# against the rule checks in move_pawn and place_fence on random positions, reporting the first mismatch.
+
+import argparse
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from Quoridor import QuoridorGame, board_for
+from positions import jump_snapshot, maze_snapshot, random_game
+from record import to_notation
+
+Mismatch = namedtuple('Mismatch', ['snapshot', 'move', 'reference', 'engine'])
+
+START_COUNTS = {1: 147, 2: 21462, 3: 3112133, 4: 448166771}    # perft from the starting position
+
+
+def perft(game, depth, cache=None):
+    """
+    Takes game, depth, and an optional dictionary to cache counts in, returns the
+    number of sequences of depth legal moves from the position (a won game has
+    none). Positions reached by different move orders are counted once each
+    time they are reached, but only searched once if a cache is given
+    """
+    if depth == 0:
+        return 1
+    if game.get_winner() is not None:
+        return 0
+    moves = game.legal_moves()
+    if depth == 1:
+        return len(moves)
+    key = (game.zobrist_hash(), depth)
+    if cache is not None and key in cache:
+        return cache[key]
+    total = 0
+    for move in moves:
+        game.make_move(move)
+        total += perft(game, depth - 1, cache)
+        game.unmake_move()
+    if cache is not None:
+        cache[key] = total
+    return total
+
+
+def divide(game, depth, cache=None):
+    """
+    Takes game, depth, and an optional cache, returns a list of (move, count) with
+    the perft count below each legal move, for finding where two counts part ways
+    """
+    counts = []
+    for move in game.legal_moves():
+        game.make_move(move)
+        counts.append((move, perft(game, depth - 1, cache)))
+        game.unmake_move()
+    return counts
+
+
+def parallel_divide(game, depth, workers):
+    """
+    Takes game, depth, and a number of worker processes, returns the same list as
+    divide with the first moves shared out between the workers
+    """
+    moves = game.legal_moves()
+    with ProcessPoolExecutor(workers) as pool:
+        counts = pool.map(perft_after, [game.snapshot()] * len(moves), moves, [depth - 1] * len(moves),
+                          [game.get_size()] * len(moves), [game.get_start_fences()] * len(moves))
+        return list(zip(moves, counts))
+
+
+def perft_after(snapshot, move, depth, size=9, fences=10):
+    """
+    Takes a snapshot, a move, depth, and the board size and starting fences, runs in
+    a worker process and returns the perft count to depth after the move is played
+    """
+    game = QuoridorGame.from_snapshot(snapshot, size, fences)
+    game.make_move(move)
+    return perft(game, depth, {})
+
+
+def engine_moves(game):
+    """
+    Takes game, returns (set of pawn targets, set of fences) that the move
+    generators legal_pawn_moves and legal_fences give for whoever's turn it is
+    """
+    return set(game.legal_pawn_moves()), set(game.legal_fences())
+
+
+def reference_moves(game):
+    """
+    Takes game, returns (set of pawn targets, set of fences) that move_pawn and
+    place_fence accept for whoever's turn it is, trying every tile and every
+    fence slot on a clone of the game
+    """
+    turn = game.get_turn()
+    size = game.get_size()
+    slots = board_for(size, game.get_start_fences()).fence_slots
+    targets = {(x, y) for y in range(0, size) for x in range(0, size) if game.clone().move_pawn(turn, (x, y))}
+    fences = {(slot[0], slot[1]) for slot in slots if game.clone().place_fence(turn, slot[0], slot[1]) is True}
+    return targets, fences
+
+
+def check_position(snapshot, engine=engine_moves, rng=None):
+    """
+    Takes a snapshot, an engine (a function like engine_moves), and an optional
+    random generator, returns the first Mismatch between the engine and the
+    reference in that position, or None. With a random generator, one legal
+    move is also played with make_move and move_pawn / place_fence to check that
+    both lead to the same position, and that unmake_move takes it back
+    """
+    game = QuoridorGame.from_snapshot(snapshot)
+    reference = reference_moves(game)
+    found = engine(game)
+    for kind, expected, got in (('p', reference[0], found[0]), ('fence', reference[1], found[1])):
+        for move in sorted(expected ^ got):
+            return Mismatch(snapshot, (kind, move) if kind == 'p' else move, move in expected, move in got)
+    moves = [('p', target) for target in reference[0]] + sorted(reference[1])
+    if rng is None or not moves:
+        return None
+    return check_make_move(game, rng.choice(moves))
+
+
+def check_make_move(game, move):
+    """
+    Takes game and a legal move, returns a Mismatch if make_move and move_pawn /
+    place_fence lead to different positions or unmake_move doesn't go back,
+    otherwise None
+    """
+    snapshot = game.snapshot()
+    played = game.clone()
+    if move[0] == 'p':
+        played.move_pawn(game.get_turn(), move[1])
+    else:
+        played.place_fence(game.get_turn(), move[0], move[1])
+    game.make_move(move)
+    if (game.snapshot(), game.zobrist_hash()) != (played.snapshot(), played.zobrist_hash()):
+        return Mismatch(snapshot, move, played.snapshot(), game.snapshot())
+    game.unmake_move()
+    if game.snapshot() != snapshot:
+        return Mismatch(snapshot, move, snapshot, game.snapshot())
+    return None
+
+
+def random_positions(rng):
+    """
+    Takes a random generator, yields snapshots without end: positions from random
+    games, face to face positions full of jumps and diagonal moves, and mazes
+    """
+    while True:
+        kind = rng.random()
+        if kind < 0.2:
+            yield jump_snapshot(rng)
+        elif kind < 0.3:
+            yield maze_snapshot(rng)
+        else:
+            yield from random_game(rng)[1][::3]
+
+
+def cross_check(count, seed=0, engine=engine_moves):
+    """
+    Takes a number of positions, a seed, and an engine, checks that many random
+    positions and returns (first Mismatch or None, positions checked, seconds)
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    checked = 0
+    for snapshot in random_positions(rng):
+        if checked == count:
+            break
+        mismatch = check_position(snapshot, engine, rng)
+        checked += 1
+        if mismatch is not None:
+            return mismatch, checked, time.perf_counter() - start
+    return None, checked, time.perf_counter() - start
+
+
+def parallel_cross_check(count, seed=0, workers=1):
+    """
+    Takes a number of positions, a seed, and a number of worker processes, shares
+    the positions out between the workers (each with its own seed) and returns
+    (first Mismatch found or None, positions checked, seconds)
+    """
+    start = time.perf_counter()
+    shares = [count // workers + (1 if i < count % workers else 0) for i in range(0, workers)]
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(pool.map(cross_check, shares, [seed + i for i in range(0, workers)]))
+    mismatches = [result[0] for result in results if result[0] is not None]
+    checked = sum(result[1] for result in results)
+    return (mismatches[0] if mismatches else None), checked, time.perf_counter() - start
+
+
+def main():
+    # python perft.py perft 4 --workers 8, or python perft.py check --positions 100000 --workers 8
+    parser = argparse.ArgumentParser(description='Check QuoridorGame move generation.')
+    parser.add_argument('command', choices=['perft', 'check'])
+    parser.add_argument('depth', type=int, nargs='?', default=3)
+    parser.add_argument('--divide', action='store_true', help='print the count below each first move')
+    parser.add_argument('--positions', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help='processes to share perft out between')
+    args = parser.parse_args()
+    if args.command == 'check':
+        mismatch, checked, seconds = parallel_cross_check(args.positions, args.seed * 1000, args.workers)
+        print(checked, 'positions in %.1f sec (%.0f/sec)' % (seconds, checked / seconds if seconds else 0))
+        if mismatch is not None:
+            print('MISMATCH:', mismatch)
+        return 1 if mismatch else 0
+    return run_perft(args.depth, args.divide, args.workers)
+
+
+def run_perft(depth, show_divide, workers=1):
+    """
+    Takes depth, whether to print divide output, and the number of worker processes,
+    runs perft from the starting position, prints the count, and returns 1 if it
+    isn't the known count
+    """
+    game = QuoridorGame()
+    start = time.perf_counter()
+    if workers > 1 and depth > 1:
+        counts = parallel_divide(game, depth, workers)
+    else:
+        counts = divide(game, depth, {})
+    if show_divide:
+        for move, count in sorted(counts, key=lambda item: to_notation(item[0])):
+            print(to_notation(move), count)
+    total = sum(count for move, count in counts)
+    print('perft(%d) = %d in %.1f sec' % (depth, total, time.perf_counter() - start))
+    expected = START_COUNTS.get(depth)
+    if expected is not None and total != expected:
+        print('EXPECTED', expected)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Position generators shared by the benchmarks and the move generation checks. Each one takes a
+# random generator, so a fixed seed always gives the same positions: random games, dense fence mazes, and
+# pawns face to face for jumps.
+
+from Quoridor import FENCE_SLOTS, H_BORDER, NEIGHBORS, QuoridorGame, V_BORDER
+from record import play_move
+
+
+def random_game(rng, max_plies=200):
+    """
+    Takes a random generator, plays a random legal game that mostly moves pawns
+    (so that it ends) and returns its list of moves along with a snapshot of
+    the position before every move
+    """
+    game = QuoridorGame()
+    moves = []
+    positions = []
+    while game.get_winner() is None and len(moves) < max_plies:
+        pawn_moves = game.legal_pawn_moves()
+        if rng.random() < 0.25 and game.get_fences(game.get_turn()) > 0:
+            choices = game.legal_fences()
+        else:
+            choices = [('p', position) for position in pawn_moves]
+        if not choices:
+            break
+        move = rng.choice(choices)
+        positions.append(game.snapshot())
+        play_move(game, move)
+        moves.append(move)
+    return moves, positions
+
+
+def maze_snapshot(rng):
+    """
+    Takes a random generator, returns a snapshot of a position where fences wall
+    off every edge but those of a random spanning tree of the tiles (a maze with
+    one path between any two tiles), which makes every path long and winding
+    """
+    h_walls = H_BORDER | sum(slot[2] for slot in FENCE_SLOTS)
+    v_walls = V_BORDER | sum(slot[3] for slot in FENCE_SLOTS)
+    visited = {40}
+    stack = [40]
+    while stack:
+        tile = stack[-1]
+        options = [(neighbor, h_bit, v_bit) for neighbor, h_bit, v_bit in NEIGHBORS[tile]
+                   if not (h_bit & H_BORDER or v_bit & V_BORDER) and neighbor not in visited]
+        if not options:
+            stack.pop()
+            continue
+        neighbor, h_bit, v_bit = rng.choice(options)
+        h_walls &= ~h_bit
+        v_walls &= ~v_bit
+        visited.add(neighbor)
+        stack.append(neighbor)
+    return h_walls, v_walls, 4, 76, 1, 10, 10, 0
+
+
+def jump_snapshot(rng):
+    """
+    Takes a random generator, returns a snapshot of a position with the pawns
+    face to face in the middle of the board and a few fences right around them,
+    so that most pawn moves are jumps or diagonal moves
+    """
+    x, y = rng.randint(1, 7), rng.randint(2, 6)
+    own = y * 9 + x
+    other = own + 9 if rng.random() < 0.5 else own + 1
+    nearby = [slot for slot in FENCE_SLOTS if abs(slot[1][0] - x) <= 1 and abs(slot[1][1] - y) <= 1]
+    fences = rng.sample(nearby, rng.randint(1, 4))
+    h_walls = H_BORDER | sum(slot[2] for slot in fences)
+    v_walls = V_BORDER | sum(slot[3] for slot in fences)
+    if rng.random() < 0.5:
+        return h_walls, v_walls, own, other, 1, 10, 10, 0
+    return h_walls, v_walls, other, own, 2, 10, 10, 0
@@ -0,0 +1,204 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Exact solver for Quoridor pawn races. Once neither player has fences left, only the pawns move
+# and the fences never change, so every pawn position under those fences is solved at once by retrograde
+# analysis, jumps and diagonal moves included. Solved fence layouts are kept in an LRU cache, so answering
+# a position is a handful of table lookups. A race won by the player who still has fences is also exact.
+# Solving a new layout takes tens of milliseconds on a 9x9 board, so searches only do it when it fits their
+# time budget, and boards larger than MAX_RACE_TILES are never solved.
+
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, namedtuple
+
+from Quoridor import QuoridorGame, board_for, pawn_destinations
+
+RACE_TABLES = 64                  # fence layouts kept solved, about 26KB each on a 9x9 board
+MAX_RACE_TILES = 121              # largest board solved (11x11), the work grows with the tiles squared
+STATE_COST_US = 4                 # rough microseconds solving a layout takes for each position in its table
+
+RaceResult = namedtuple('RaceResult', ['winner', 'plies', 'move'])
+
+_tables = OrderedDict()           # solved tables by (size, fence bitmasks), least recently used first
+_tables_lock = threading.Lock()
+
+
+def race_table(h_walls, v_walls, size=9):
+    """
+    Takes the fence bitmasks and the width of the board, returns the solved table
+    for those fences (see solve_table) from the cache, solving it and caching it
+    first if it isn't there. The least recently used tables past RACE_TABLES are dropped
+    """
+    key = (size, h_walls, v_walls)
+    with _tables_lock:
+        values = _tables.get(key)
+        if values is not None:
+            _tables.move_to_end(key)
+            return values
+    values = solve_table(h_walls, v_walls, size)
+    with _tables_lock:
+        _tables[key] = values
+        while len(_tables) > RACE_TABLES:
+            _tables.popitem(last=False)
+    return values
+
+
+def table_affordable(h_walls, v_walls, size, budget_ms=None):
+    """
+    Takes the fence bitmasks, the width of the board, and a time budget in
+    milliseconds (None for no limit), returns True if the table for those fences
+    is cached, or the board is small enough to solve and solving fits the budget
+    """
+    if (size, h_walls, v_walls) in _tables:
+        return True
+    if size * size > MAX_RACE_TILES:
+        return False
+    return budget_ms is None or 2 * size ** 4 * STATE_COST_US / 1000 <= budget_ms
+
+
+def solve_table(h_walls, v_walls, size=9):
+    """
+    Takes the fence bitmasks and the width of the board, returns an array with the
+    value of every pawn race position under those fences for whoever's turn it is,
+    indexed by race_index: n > 0 wins in n plies, n < 0 loses in -n plies, and 0
+    is a race nobody can force (a pawn that can't move, or moving back and forth
+    for ever). Positions where a pawn is already on its goal row are left at 0
+    """
+    tiles = size * size
+    values = array('h', bytes(4 * tiles * tiles))
+    counts, predecessors, solved = race_moves(h_walls, v_walls, size, values)
+    for state in solved:
+        value = values[state]
+        for parent in predecessors[state]:
+            if values[parent]:
+                continue
+            if value < 0:                # the parent can move into a lost race
+                values[parent] = 1 - value
+                solved.append(parent)
+                continue
+            counts[parent] -= 1
+            if counts[parent] == 0:      # every move is into a won race, so the last one found is the longest
+                values[parent] = -1 - value
+                solved.append(parent)
+    return values
+
+
+def race_moves(h_walls, v_walls, size, values):
+    """
+    Takes the fence bitmasks, the width of the board, and the values array, marks
+    every position whose mover can step onto the goal row as won in one ply and
+    returns (moves from each position, positions each position is reached from,
+    list of the positions won in one ply)
+    """
+    neighbors = board_for(size).neighbors
+    tiles = size * size
+    counts = [0] * (2 * tiles * tiles)
+    predecessors = [[] for state in range(0, 2 * tiles * tiles)]
+    solved = []
+    for turn in (1, 2):
+        goal = size - 1 if turn == 1 else 0
+        for own in range(0, tiles):
+            for other in range(0, tiles):
+                if own == other or own // size == goal or other // size == size - 1 - goal:
+                    continue
+                state = race_index(turn, own, other, tiles)
+                destinations = pawn_destinations(h_walls, v_walls, own, other, neighbors)
+                counts[state] = len(destinations)
+                if any(destination // size == goal for destination in destinations):
+                    values[state] = 1
+                    solved.append(state)
+                    continue
+                for destination in destinations:
+                    predecessors[race_index(3 - turn, other, destination, tiles)].append(state)
+    return counts, predecessors, solved
+
+
+def race_index(turn, own, other, tiles):
+    """
+    Takes whose turn it is, the tiles of the moving pawn and the other
+    pawn, and the number of tiles, returns the position's index in a race table
+    """
+    return ((turn - 1) * tiles + own) * tiles + other
+
+
+def solve_race(game, budget_ms=None):
+    """
+    Takes game and an optional time budget in milliseconds, returns a RaceResult
+    (winner, plies until the winning pawn reaches its goal with best play, and the
+    best move for whoever's turn it is) if the outcome is certain, otherwise None.
+    It is certain when neither player has fences left, or when only one player
+    does and that player wins the race without placing any. Races nobody can force
+    are None too, and so are races whose table isn't cached and can't be solved
+    within the budget (see table_affordable)
+    """
+    h_walls, v_walls, p1, p2, turn, p1_fences, p2_fences, winner = game.snapshot()
+    size = game.get_size()
+    if winner or (p1_fences and p2_fences) or not table_affordable(h_walls, v_walls, size, budget_ms):
+        return None
+    if (p1_fences or p2_fences) and not race_ahead(game, 1 if p1_fences else 2):
+        return None
+    own, other = (p1, p2) if turn == 1 else (p2, p1)
+    value = race_table(h_walls, v_walls, size)[race_index(turn, own, other, size * size)]
+    if value == 0:
+        return None
+    racer = turn if value > 0 else 3 - turn
+    if (p1_fences or p2_fences) and racer != (1 if p1_fences else 2):
+        return None
+    return RaceResult(racer, abs(value), race_move(h_walls, v_walls, turn, own, other, size))
+
+
+def race_ahead(game, player):
+    """
+    Takes game and a player, returns True if that player's shortest path is no longer
+    than the opponent's, counting the move in hand. It only saves solving races the
+    player with fences is unlikely to win, so it doesn't have to be exact
+    """
+    own = game.distance_to_goal(player)
+    other = game.distance_to_goal(3 - player)
+    if own is None or other is None:
+        return False
+    return own - (game.get_turn() == player) < other
+
+
+def race_move(h_walls, v_walls, turn, own, other, size):
+    """
+    Takes the fence bitmasks, whose turn it is, the tiles of the moving pawn and the
+    other pawn, and the width of the board, returns the best pawn move: the quickest
+    win, or the longest loss, or a move that keeps an unforced race going
+    """
+    board = board_for(size)
+    tiles = size * size
+    values = race_table(h_walls, v_walls, size)
+    goal = size - 1 if turn == 1 else 0
+    best = None
+    best_score = None
+    for destination in pawn_destinations(h_walls, v_walls, own, other, board.neighbors):
+        value = values[race_index(3 - turn, other, destination, tiles)]
+        if destination // size == goal:
+            score = 1 << 16
+        else:
+            score = (1 << 15) + value if value < 0 else -(1 << 15) + value if value > 0 else 0
+        if best_score is None or score > best_score:
+            best = destination
+            best_score = score
+    return 'p', board.positions[best]
+
+
+def main():
+    # solves the race after both players have used up their fences in a short game
+    game = QuoridorGame(9, 1)
+    for move in [('h', (4, 5)), ('v', (4, 3)), ('p', (4, 1)), ('p', (4, 7))]:
+        game.make_move(move)
+    start = time.perf_counter()
+    result = solve_race(game)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    solve_race(game)
+    print(result, 'solved in %.1f ms, then %.1f us' % (first * 1000, (time.perf_counter() - start) * 1e6))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
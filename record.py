@@ -0,0 +1,347 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Compact game records for Quoridor. Every pawn move or fence is stored as one byte (two on
+# boards with more than 256 moves), games are written one after another into archive files, and archives are
+# read back and replayed one game at a time to check them. Moves can also be written in text notation, e2 for a
+# pawn move and d5h for a fence.
+
+import functools
+import json
+import re
+import struct
+import sys
+import time
+from array import array
+
+from Quoridor import QuoridorGame
+
+MAGIC = b'QRA2'                      # first bytes of every archive file
+HEADER = struct.Struct('<BBBHH')     # board size, starting fences, winner, number of moves, length of the tags
+NOTATION = re.compile(r'([a-z]+)([0-9]+)([hv]?)$')
+
+
+@functools.lru_cache(maxsize=None)
+def build_move_codes(size=9):
+    """
+    Takes the width of the board, builds the table of every move on the board in
+    code order: the pawn moves by tile, then the horizontal fences, then the
+    vertical fences (81, 72, and 72 of them on a 9x9 board)
+    """
+    moves = [('p', (tile % size, tile // size)) for tile in range(0, size * size)]
+    moves.extend(('h', (x, y)) for y in range(1, size) for x in range(0, size))
+    moves.extend(('v', (x, y)) for y in range(0, size) for x in range(1, size))
+    return tuple(moves), {move: code for code, move in enumerate(moves)}
+
+
+MOVES, CODES = build_move_codes()
+
+
+def code_type(size):
+    """
+    Takes the width of the board, returns the array type code its move codes are
+    stored with: 'B' (one byte) if every code fits in a byte, otherwise 'H'
+    """
+    return 'B' if len(build_move_codes(size)[0]) <= 256 else 'H'
+
+
+def encode_move(move, size=9):
+    """
+    Takes a move, ('p', (x, y)) or ('h' / 'v', (x, y)), and the width of the board, returns its code
+    """
+    return build_move_codes(size)[1][move[0], tuple(move[1])]
+
+
+def decode_move(code, size=9):
+    """
+    Takes a move code and the width of the board, returns the move
+    """
+    return build_move_codes(size)[0][code]
+
+
+def to_notation(move):
+    """
+    Takes a move, returns it in text notation: the column as a letter from a and
+    the row as a number from 1, followed by h or v for a fence, so ('p', (4, 1))
+    is e2 and ('h', (3, 4)) is d5h. Columns past z go on aa, ab, and so on
+    """
+    kind, (x, y) = move
+    column = ''
+    x += 1
+    while x:
+        x, letter = divmod(x - 1, 26)
+        column = chr(97 + letter) + column
+    text = column + str(y + 1)
+    return text if kind == 'p' else text + kind
+
+
+def from_notation(text):
+    """
+    Takes a move in text notation, returns the move, or raises
+    ValueError if the text isn't a move
+    """
+    match = NOTATION.match(text)
+    if match is None or match.group(2)[0] == '0':
+        raise ValueError('not a move: ' + text)
+    x = 0
+    for letter in match.group(1):
+        x = x * 26 + ord(letter) - 96
+    return match.group(3) or 'p', (x - 1, int(match.group(2)) - 1)
+
+
+class GameRecord:
+    """
+    This represents the record of one game: its moves, stored one byte each (two on
+    boards with more than 256 moves), the board size and starting fences, the winner
+    (0 if nobody has won yet), and tags, a dictionary of anything else worth keeping
+    with the game such as the players or the date. A record can follow a game as it
+    is played by being attached to it, and can be replayed to check it
+    """
+
+    def __init__(self, tags=None, size=9, fences=10):
+        """
+        Takes an optional dictionary of tags, board size, and starting
+        fences, initializes an empty record
+        """
+        self._tags = dict(tags or {})
+        self._size = size
+        self._fences = fences
+        self._moves = array(code_type(size))
+        self._winner = 0
+
+    def attach(self, game):
+        """
+        Takes a game, records every move made on it with move_pawn or place_fence
+        from now on. An empty record takes the game's board size and fences
+        """
+        if not self._moves:
+            self._size = game.get_size()
+            self._fences = game.get_start_fences()
+            self._moves = array(code_type(self._size))
+        game.set_listener(self.add)
+
+    def add(self, turn, move):
+        """
+        Takes turn and move, adds a move that was made to the record,
+        noting the winner if the move reached the goal row
+        """
+        self._moves.append(encode_move(move, self._size))
+        if move[0] == 'p' and move[1][1] == (self._size - 1 if turn == 1 else 0):
+            self._winner = turn
+
+    def get_moves(self):
+        """
+        Returns the list of moves in the record
+        """
+        moves = build_move_codes(self._size)[0]
+        return [moves[code] for code in self._moves]
+
+    def get_winner(self):
+        """
+        Returns the winner the record gives, 0 for nobody
+        """
+        return self._winner
+
+    def get_tags(self):
+        """
+        Returns the dictionary of tags
+        """
+        return self._tags
+
+    def get_board(self):
+        """
+        Returns (board size, starting fences) of the game the record is for
+        """
+        return self._size, self._fences
+
+    def to_bytes(self):
+        """
+        Returns the record in binary form: a header with the board size, starting
+        fences, winner, number of moves, and length of the tags, then the tags as
+        JSON, then the moves, one byte each or two little-endian bytes each
+        """
+        tags = json.dumps(self._tags, separators=(',', ':')).encode() if self._tags else b''
+        moves = array(self._moves.typecode, self._moves)
+        if sys.byteorder == 'big':
+            moves.byteswap()
+        header = HEADER.pack(self._size, self._fences, self._winner, len(self._moves), len(tags))
+        return header + tags + moves.tobytes()
+
+    @classmethod
+    def read(cls, stream):
+        """
+        Takes a binary file, reads the next record from it and returns it, or returns
+        None at the end of the file. Raises ValueError if the file ends in the middle
+        of a record
+        """
+        header = stream.read(HEADER.size)
+        if not header:
+            return None
+        if len(header) < HEADER.size:
+            raise ValueError('archive ends in the middle of a record')
+        size, fences, winner, count, length = HEADER.unpack(header)
+        record = cls(None, size, fences)
+        tags = stream.read(length)
+        moves = stream.read(count * record._moves.itemsize)
+        if len(tags) < length or len(moves) < count * record._moves.itemsize:
+            raise ValueError('archive ends in the middle of a record')
+        record._tags = json.loads(tags) if tags else {}
+        record._winner = winner
+        record._moves.frombytes(moves)
+        if sys.byteorder == 'big':
+            record._moves.byteswap()
+        return record
+
+    def replay(self):
+        """
+        Plays the record's moves on a new game with move_pawn and place_fence and
+        returns the game, or raises ValueError if the board can't be played, a move
+        is illegal, or the game's winner doesn't match the record's
+        """
+        game = QuoridorGame(self._size, self._fences)
+        moves = build_move_codes(self._size)[0]
+        for ply, code in enumerate(self._moves):
+            if code >= len(moves):
+                raise ValueError('move %d: unknown move code %d' % (ply + 1, code))
+            if not play_move(game, moves[code]):
+                raise ValueError('move %d: %s is illegal' % (ply + 1, to_notation(moves[code])))
+        if (game.get_winner() or 0) != self._winner:
+            raise ValueError('record says winner %d, replay gives %d' % (self._winner, game.get_winner() or 0))
+        return game
+
+    def to_text(self):
+        """
+        Returns the moves in text notation, separated by spaces
+        """
+        return ' '.join(to_notation(move) for move in self.get_moves())
+
+    @classmethod
+    def from_text(cls, text, tags=None, size=9, fences=10):
+        """
+        Takes moves in text notation separated by spaces, optional tags, and the
+        board size and starting fences, plays the moves and returns their record,
+        or raises ValueError if a move isn't legal
+        """
+        record = cls(tags)
+        game = QuoridorGame(size, fences)
+        record.attach(game)
+        for word in text.split():
+            if not play_move(game, from_notation(word)):
+                raise ValueError(word + ' is illegal')
+        return record
+
+
+def play_move(game, move):
+    """
+    Takes game and move, makes the move for whoever's turn it is with move_pawn
+    or place_fence and returns True if it was legal, otherwise False
+    """
+    kind, position = move
+    if kind == 'p':
+        return game.move_pawn(game.get_turn(), position)
+    return game.place_fence(game.get_turn(), kind, position) is True
+
+
+def write_archive(path, records):
+    """
+    Takes a path and records (any iterable, such as a generator of games as they
+    finish), appends the records to the archive at path, creating it if needed,
+    and returns the number of records written. Raises ValueError if path holds
+    something other than a game archive
+    """
+    count = 0
+    with open(path, 'ab') as archive:
+        if archive.tell() == 0:
+            archive.write(MAGIC)
+        elif archive_magic(path) != MAGIC:
+            raise ValueError(path + ' is not a game archive')
+        for record in records:
+            archive.write(record.to_bytes())
+            count += 1
+    return count
+
+
+def read_archive(path):
+    """
+    Takes the path of an archive, yields its records one at a time without reading
+    the whole file in. Raises ValueError if the file isn't an archive
+    """
+    with open(path, 'rb') as archive:
+        if archive.read(len(MAGIC)) != MAGIC:
+            raise ValueError(path + ' is not a game archive')
+        record = GameRecord.read(archive)
+        while record is not None:
+            yield record
+            record = GameRecord.read(archive)
+
+
+def archive_magic(path):
+    """
+    Takes the path of an archive, returns the bytes it starts with
+    """
+    with open(path, 'rb') as archive:
+        return archive.read(len(MAGIC))
+
+
+def validate_archives(paths):
+    """
+    Takes a list of archive paths, replays every record in them one at a time and
+    yields (path, index, error) for each, where error is None if the record checks
+    out, otherwise a message saying what is wrong with it. An archive that can't be
+    opened or read any further (cut short, or with tags that aren't JSON) gives one
+    last entry with the index of the record it failed on, and checking goes on with
+    the next archive
+    """
+    for path in paths:
+        records = read_archive(path)
+        index = 0
+        while True:
+            try:
+                record = next(records, None)
+            except (OSError, ValueError) as error:
+                yield path, index, str(error)
+                break
+            if record is None:
+                break
+            yield path, index, replay_error(record)
+            index += 1
+
+
+def replay_error(record):
+    """
+    Takes a record, replays it and returns None if it checks
+    out, otherwise a message saying what is wrong with it
+    """
+    try:
+        record.replay()
+    except ValueError as error:
+        return str(error)
+    return None
+
+
+def audit(paths):
+    """
+    Takes a list of archive paths, checks every record and returns (games,
+    list of (path, index, error) for the bad ones, games per second)
+    """
+    start = time.perf_counter()
+    games = 0
+    bad = []
+    for path, index, error in validate_archives(paths):
+        games += 1
+        if error is not None:
+            bad.append((path, index, error))
+    elapsed = time.perf_counter() - start
+    return games, bad, games / elapsed if elapsed > 0 else 0.0
+
+
+def main():
+    # checks the archives named on the command line and prints the games per second
+    games, bad, rate = audit(sys.argv[1:])
+    for path, index, error in bad:
+        print(path, 'game', index, ':', error)
+    print(games, 'games checked,', len(bad), 'bad,', int(rate), 'games/sec')
+    return 1 if bad else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,514 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Alpha-beta search engine for QuoridorGame. best_move runs a negamax alpha-beta search with
+# iterative deepening inside a hard time budget and returns the best move found along with search statistics.
+# ParallelSearcher splits the root moves over a pool of worker processes that share the best score found.
+
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from Quoridor import NO_PATH, QuoridorGame
+from race import solve_race
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+WIN = 1000000                     # score for a won position, less the plies it takes to get there
+INFINITY = WIN + 1
+MAX_DEPTH = 64
+TIME_CHECK = 3                    # the clock is read every TIME_CHECK + 1 leaf nodes, and at every other node
+
+SearchResult = namedtuple('SearchResult', ['move', 'score', 'depth', 'nodes', 'nps', 'elapsed_ms'])
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget runs out
+    """
+    pass
+
+
+class Searcher:
+    """
+    This represents an alpha-beta search engine for QuoridorGame. Positions are scored
+    by the difference between the two players' shortest path lengths. The search deepens
+    one ply at a time until the time budget runs out, playing moves on the game with
+    make_move and taking them back with unmake_move. Moves are ordered with the move
+    from the transposition table first, then pawn moves that shorten the mover's path,
+    killer moves, fences next to the opponent's shortest path, and the history
+    heuristic. A Searcher keeps its transposition table between searches. It plays the
+    opening book's move without searching when the position is in the book (the default
+    book in book.BOOK_PATH unless told otherwise), and a pawn race with a certain
+    outcome is answered by the race solver instead
+    """
+
+    def __init__(self, table_size=1 << 18, book=None):
+        """
+        Takes table_size, the number of transposition table buckets, and the book to
+        play from (see opening_book: None for the default book, False for no book), and
+        initializes the table, killer moves, history scores, and counters
+        """
+        self._book = book
+        self._table = TranspositionTable(table_size)
+        self._killers = [[None, None] for ply in range(0, MAX_DEPTH + 1)]
+        self._history = {}
+        self._nodes = 0
+        self._ply = 0
+        self._deadline = 0.0
+        self._root_best = None          # best root move so far in the current iteration
+
+    def search(self, game, time_ms=1000, max_depth=MAX_DEPTH):
+        """
+        Takes game, time_ms, and max_depth, searches the position for whoever's turn
+        it is until time_ms milliseconds have passed or max_depth is reached, and
+        returns a SearchResult. The game is left as it was. The move is None if the
+        game has already been won
+        """
+        start = time.perf_counter()
+        result = book_result(opening_book(self._book), game, start) or race_result(game, start, time_ms)
+        if result is not None:
+            return result
+        self._deadline = start + time_ms / 1000
+        self._nodes = 0
+        self._table.new_search()
+        moves = self.ordered_moves(game, 0, None)
+        best = (moves[0] if moves else None, 0, 0)
+        for depth in range(1, max_depth + 1):
+            if not moves:
+                break
+            try:
+                best = self.search_root(game, moves, depth)
+            except SearchTimeout:
+                self.unwind(game)
+                if self._root_best is not None:
+                    best = (self._root_best[0], self._root_best[1], best[2])
+                break
+            moves.remove(best[0])
+            moves.insert(0, best[0])
+            if abs(best[1]) >= WIN - MAX_DEPTH:
+                break
+        return self.result(best, start)
+
+    def result(self, best, start):
+        """
+        Takes the best (move, score, depth) and the start time,
+        returns the SearchResult for the search
+        """
+        elapsed = time.perf_counter() - start
+        nps = int(self._nodes / elapsed) if elapsed > 0 else 0
+        return SearchResult(best[0], best[1], best[2], self._nodes, nps, elapsed * 1000)
+
+    def unwind(self, game):
+        """
+        Takes game, takes back every move the search still had
+        made on it when the time budget ran out
+        """
+        while self._ply > 0:
+            game.unmake_move()
+            self._ply -= 1
+
+    def search_root(self, game, moves, depth, shared=None):
+        """
+        Takes game, the ordered root moves, depth, and an optional shared value
+        holding the best score any process has found at this depth, searches each
+        root move and returns (best move, score, depth, exact). A move that can't
+        beat the shared score is only given an upper bound, so exact is False when
+        the best move returned didn't beat the bound it was searched with
+        """
+        best = (moves[0], -INFINITY, depth, False)
+        self._root_best = None
+        for move in moves:
+            if time.perf_counter() >= self._deadline:
+                raise SearchTimeout
+            bound = best[1] if shared is None else max(best[1], shared.value)
+            game.make_move(move)
+            self._ply += 1
+            score = -self.negamax(game, depth - 1, -INFINITY, -bound, 1)
+            game.unmake_move()
+            self._ply -= 1
+            if score > best[1]:
+                best = (move, score, depth, score > bound)
+                self._root_best = (move, score)
+                publish(shared, score)
+        if shared is None:
+            self._table.store(game.zobrist_hash(), depth, best[1], EXACT, best[0])
+        return best
+
+    def search_chunk(self, game, moves, depth, time_ms, shared):
+        """
+        Takes game, some of the root moves, depth, time_ms, and the shared best
+        score, searches those moves to the given depth within time_ms milliseconds.
+        Returns (best move, score, exact, finished, nodes), where finished is False
+        if the time ran out first
+        """
+        self._deadline = time.perf_counter() + time_ms / 1000
+        self._nodes = 0
+        self._table.new_search()
+        try:
+            move, score, depth, exact = self.search_root(game, moves, depth, shared)
+        except SearchTimeout:
+            self.unwind(game)
+            return None, -INFINITY, False, False, self._nodes
+        return move, score, exact, True, self._nodes
+
+    def negamax(self, game, depth, alpha, beta, ply):
+        """
+        Takes game, depth, alpha, beta, and ply, returns the score of the position
+        for whoever's turn it is, searched to the given depth. Scores at or above
+        beta and at or below alpha are only bounds. The clock is read before every
+        node that generates moves, as that costs far more than reading it, so the
+        search never goes over its deadline by more than a few evaluations
+        """
+        self._nodes += 1
+        if (depth > 0 or self._nodes & TIME_CHECK == 0) and time.perf_counter() >= self._deadline:
+            raise SearchTimeout
+        if game.get_winner() is not None:
+            return ply - WIN
+        if depth == 0:
+            return self.evaluate(game)
+        key = game.zobrist_hash()
+        entry = self._table.probe(key)
+        if entry is not None and entry[0] >= depth:
+            score = self.table_cutoff(entry, alpha, beta, ply)
+            if score is not None:
+                return score
+        best = self.search_moves(game, depth, alpha, beta, ply, entry[3] if entry else None)
+        flag = UPPER if best[0] <= alpha else LOWER if best[0] >= beta else EXACT
+        self._table.store(key, depth, to_table(best[0], ply), flag, best[1])
+        return best[0]
+
+    def search_moves(self, game, depth, alpha, beta, ply, table_move):
+        """
+        Takes game, depth, alpha, beta, ply, and the transposition table move,
+        searches the moves in order and returns (best score, best move), stopping
+        at the first move that scores at least beta
+        """
+        best_score = -INFINITY
+        best_move = None
+        for move in self.ordered_moves(game, ply, table_move):
+            game.make_move(move)
+            self._ply += 1
+            score = -self.negamax(game, depth - 1, -beta, -max(alpha, best_score), ply + 1)
+            game.unmake_move()
+            self._ply -= 1
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score >= beta:
+                    self.reward(move, depth, ply)
+                    break
+        return best_score, best_move
+
+    def table_cutoff(self, entry, alpha, beta, ply):
+        """
+        Takes a transposition table entry, alpha, beta, and ply, returns the
+        stored score if it settles the position, otherwise None
+        """
+        depth, score, flag, move = entry
+        score = from_table(score, ply)
+        if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+            return score
+        return None
+
+    def reward(self, move, depth, ply):
+        """
+        Takes a move that caused a cutoff, depth, and ply, records it as a
+        killer move for the ply and adds to its history score
+        """
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self._history[move] = self._history.get(move, 0) + depth * depth
+
+    def ordered_moves(self, game, ply, table_move):
+        """
+        Takes game, ply, and the transposition table move, returns the
+        legal moves sorted with the most promising first
+        """
+        turn = game.get_turn()
+        distances = game.distance_map(turn)
+        size = game.get_size()
+        here = distances[tile(game.get_pawn(turn), size)]
+        path = set(game.shortest_path(3 - turn) or ())
+        path.add(game.get_pawn(3 - turn))
+        killers = self._killers[ply]
+        scored = []
+        for move in game.legal_moves():
+            if move == table_move:
+                score = 1 << 40
+            elif move[0] == 'p':
+                score = (1 << 30) * (here - distances[tile(move[1], size)] + 1)
+            elif move in killers:
+                score = 1 << 29
+            else:
+                score = (1 << 28) * next_to_path(move, path) + self._history.get(move, 0)
+            scored.append((score, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for score, move in scored]
+
+    def evaluate(self, game):
+        """
+        Takes game, returns the score of the position for whoever's turn it is:
+        ten points for every step the opponent's path is longer than the mover's,
+        and a point for every fence the mover has more than the opponent
+        """
+        turn = game.get_turn()
+        own = game.distance_to_goal(turn)
+        other = game.distance_to_goal(3 - turn)
+        own = NO_PATH if own is None else own
+        other = NO_PATH if other is None else other
+        return (other - own) * 10 + game.get_fences(turn) - game.get_fences(3 - turn)
+
+
+class ParallelSearcher:
+    """
+    This represents a search that splits the root moves of each iteration over a
+    pool of worker processes. Each worker searches its share of the moves with its
+    own Searcher (and transposition table), starting from a snapshot of the game
+    rather than a pickled QuoridorGame. The best score found so far at the current
+    depth is kept in shared memory so every worker can prune against it. An
+    iteration only counts once every worker has finished it. Like Searcher, it plays
+    book moves and solved pawn races without searching
+    """
+
+    def __init__(self, workers=None, book=None):
+        """
+        Takes workers, the number of processes (the number of CPUs by default), and the
+        book to play from (see opening_book), and starts the process pool along with
+        the shared best score
+        """
+        self._book = book
+        self._workers = workers or os.cpu_count() or 1
+        self._shared = multiprocessing.Value('i', -INFINITY)
+        self._pool = ProcessPoolExecutor(self._workers, initializer=start_worker,
+                                         initargs=(self._shared,))
+        self._orderer = Searcher(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Shuts down the worker processes
+        """
+        self._pool.shutdown()
+
+    def search(self, game, time_ms=1000, max_depth=MAX_DEPTH):
+        """
+        Takes game, time_ms, and max_depth, searches the position like Searcher.search
+        but with the root moves shared out between the worker processes, and returns
+        a SearchResult with the nodes and nodes per second of all workers together
+        """
+        start = time.perf_counter()
+        result = book_result(opening_book(self._book), game, start) or race_result(game, start, time_ms)
+        if result is not None:
+            return result
+        deadline = start + time_ms / 1000
+        moves = self._orderer.ordered_moves(game, 0, None)
+        best = (moves[0] if moves else None, 0, 0)
+        nodes = 0
+        for depth in range(1, max_depth + 1):
+            if not moves:
+                break
+            outcome, searched = self.search_depth(game, moves, depth, deadline)
+            nodes += searched
+            if outcome is None:
+                break
+            best = outcome
+            moves.remove(best[0])
+            moves.insert(0, best[0])
+            if abs(best[1]) >= WIN - MAX_DEPTH:
+                break
+        elapsed = time.perf_counter() - start
+        return SearchResult(best[0], best[1], best[2], nodes, int(nodes / elapsed), elapsed * 1000)
+
+    def search_depth(self, game, moves, depth, deadline):
+        """
+        Takes game, the ordered root moves, depth, and the deadline, hands a snapshot
+        of the game and the moves out to the workers in turn and returns ((move, score,
+        depth), nodes), or (None, nodes) if the time ran out before every worker finished
+        """
+        time_ms = (deadline - time.perf_counter()) * 1000
+        if time_ms <= 0:
+            return None, 0
+        self._shared.value = -INFINITY
+        variant = (game.snapshot(), game.get_size(), game.get_start_fences())
+        futures = [self._pool.submit(search_chunk, variant, moves[i::self._workers], depth, time_ms)
+                   for i in range(0, min(self._workers, len(moves)))]
+        results = [future.result() for future in futures]
+        nodes = sum(result[4] for result in results)
+        if not all(result[3] for result in results):
+            return None, nodes
+        exact = [result for result in results if result[2]] or results
+        move, score = max(exact, key=lambda result: result[1])[0:2]
+        return (move, score, depth), nodes
+
+
+_worker_searcher = None          # the Searcher of a worker process, see start_worker
+_worker_shared = None
+
+
+def start_worker(shared):
+    """
+    Takes the shared best score, sets up the Searcher a worker
+    process keeps for as long as the pool is running
+    """
+    global _worker_searcher, _worker_shared
+    _worker_searcher = Searcher()
+    _worker_shared = shared
+
+
+def search_chunk(variant, moves, depth, time_ms):
+    """
+    Takes (game snapshot, board size, starting fences), some root moves, depth, and
+    time_ms, runs in a worker process and returns the result of Searcher.search_chunk
+    """
+    game = QuoridorGame.from_snapshot(*variant)
+    return _worker_searcher.search_chunk(game, moves, depth, time_ms, _worker_shared)
+
+
+def publish(shared, score):
+    """
+    Takes the shared best score (or None) and a score, raises
+    the shared score to the new one if it is higher
+    """
+    if shared is not None and score > shared.value:
+        with shared.get_lock():
+            if score > shared.value:
+                shared.value = score
+
+
+def opening_book(book):
+    """
+    Takes the book a searcher was given, returns the OpeningBook to probe or None: for
+    None the default book (book.load_book, None if there is no book file), for False
+    no book, and anything else is taken to be an OpeningBook. The book module imports
+    this one, so it is imported here rather than at the top
+    """
+    if book is None:
+        from book import load_book
+        return load_book()
+    return book or None
+
+
+def book_result(book, game, start):
+    """
+    Takes an OpeningBook (or None), game, and the time the search started, returns
+    a SearchResult for the book move (score and depth 0, no nodes searched) if the
+    position is in the book, otherwise None
+    """
+    move = book.probe(game) if book is not None else None
+    if move is None:
+        return None
+    return SearchResult(move, 0, 0, 0, 0, (time.perf_counter() - start) * 1000)
+
+
+def race_result(game, start, time_ms):
+    """
+    Takes game, the time the search started, and its time budget, returns a
+    SearchResult for the best move of a pawn race whose outcome is certain (scored
+    like a won or lost position that many plies away, no nodes searched), otherwise
+    None. A race that isn't solved yet is only solved if that takes at most half
+    the budget, leaving the rest for the search if the race turns out not to be certain
+    """
+    race = solve_race(game, time_ms / 2)
+    if race is None:
+        return None
+    score = WIN - race.plies if race.winner == game.get_turn() else race.plies - WIN
+    return SearchResult(race.move, score, race.plies, 0, 0, (time.perf_counter() - start) * 1000)
+
+
+def tile(position, size=9):
+    """
+    Takes an (x, y) position and the width of the board,
+    returns its index in a distance map
+    """
+    return position[1] * size + position[0]
+
+
+def next_to_path(move, path):
+    """
+    Takes a fence move and a set of (x, y) tiles, returns 1 if the
+    fence is on an edge of one of those tiles, otherwise 0
+    """
+    direction, (x, y) = move
+    if (x, y) in path:
+        return 1
+    if direction == 'h':
+        return 1 if (x, y - 1) in path else 0
+    return 1 if (x - 1, y) in path else 0
+
+
+def to_table(score, ply):
+    """
+    Takes score and ply, returns the score to store in the table, with
+    won and lost scores counted from this position rather than the root
+    """
+    if score >= WIN - MAX_DEPTH:
+        return score + ply
+    if score <= MAX_DEPTH - WIN:
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    """
+    Takes a stored score and ply, returns the score counted from the root
+    """
+    if score >= WIN - MAX_DEPTH:
+        return score - ply
+    if score <= MAX_DEPTH - WIN:
+        return score + ply
+    return score
+
+
+def best_move(game, time_ms=1000, searcher=None, workers=1, book=None):
+    """
+    Takes game, time_ms, an optional Searcher or ParallelSearcher to reuse, and the
+    number of worker processes and book (see opening_book) to use if no searcher is given,
+    searches the position for whoever's turn it is for at most time_ms milliseconds
+    and returns a SearchResult holding the move, its score, the depth reached, the
+    number of nodes searched, and the nodes per second
+    """
+    if searcher is not None:
+        return searcher.search(game, time_ms)
+    if workers > 1:
+        with ParallelSearcher(workers, book) as searcher:
+            return searcher.search(game, time_ms)
+    return Searcher(book=book).search(game, time_ms)
+
+
+def measure_scaling(game, time_ms=2000, max_workers=None):
+    """
+    Takes game, time_ms, and max_workers (the number of CPUs by default), searches
+    the position with 1, 2, ... max_workers processes and returns a list of
+    (workers, nodes per second, depth) showing how throughput grows with cores.
+    The opening book is left out, so every position is really searched
+    """
+    rows = []
+    for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        if workers == 1:
+            result = Searcher(book=False).search(game, time_ms)
+        else:
+            with ParallelSearcher(workers, book=False) as searcher:
+                result = searcher.search(game, time_ms)
+        rows.append((workers, result.nps, result.depth))
+    return rows
+
+
+def main():
+    # prints search throughput for each number of worker processes
+    game = QuoridorGame()
+    for move in [('p', (4, 1)), ('p', (4, 7)), ('h', (4, 3)), ('v', (3, 6))]:
+        game.make_move(move)
+    for workers, nps, depth in measure_scaling(game):
+        print(workers, 'workers:', nps, 'nodes/sec, depth', depth)
+
+
+if __name__ == '__main__':
+    main()
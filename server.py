@@ -0,0 +1,586 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Asyncio game server for Quoridor. Clients talk to it in line delimited JSON over TCP or a
+# local socket, each game is a session with two seats and any number of spectators, and bot moves are
+# worked out in a process pool. Also has a load generator that reports move latency for a number of sessions.
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from Quoridor import QuoridorGame
+from record import GameRecord, from_notation, play_move, to_notation
+from tournament import greedy_move, make_agent
+
+IDLE_TIMEOUT = 300               # seconds a session can go without a message before it is closed
+EVICT_INTERVAL = 10              # seconds between checks for idle sessions
+BOT_AGENTS = {'random': 0, 'greedy': 0,                   # agents a client may ask for as a bot, with the
+              'alphabeta': 5000, 'mcts': 10000}           # largest option allowed (ms or iterations, 0 for none)
+BOT_ATTEMPTS = 2                 # tries at a bot move, each on a new process pool if a worker died
+MAX_BUFFERED = 1 << 20           # bytes a client can leave unread before it is dropped
+
+
+class Connection:
+    """
+    This represents one client connection: the stream it writes to and the
+    sessions it is seated in or watching
+    """
+
+    def __init__(self, writer):
+        """
+        Takes the stream writer, initializes a connection that is in no sessions
+        """
+        self._writer = writer
+        self._sessions = set()
+
+    def send(self, message):
+        """
+        Takes a dictionary, writes it to the client as one line of JSON. Nothing is
+        awaited, so a slow client can never hold up a broadcast to the others. Instead
+        a client that leaves more than MAX_BUFFERED bytes unread is dropped, so the
+        server never buffers without limit for a client that stopped reading
+        """
+        if self._writer.is_closing():
+            return
+        self._writer.write(json.dumps(message).encode() + b'\n')
+        if self._writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            self._writer.transport.abort()
+
+    def get_sessions(self):
+        """
+        Returns the set of session numbers the connection is in
+        """
+        return self._sessions
+
+
+class Session:
+    """
+    This represents one game on the server: the game, a record of its moves, the
+    connection in each seat (None for an empty seat), an optional bot agent spec
+    for player 2, the spectators, a lock so that moves are played one at a time,
+    the bot moves being worked out, and when the session last saw any activity
+    """
+
+    def __init__(self, number, bot=None):
+        """
+        Takes the session number and a bot agent spec (None
+        for two human players), initializes a new game
+        """
+        self._number = number
+        self._game = QuoridorGame()
+        self._record = GameRecord({'session': number})
+        self._record.attach(self._game)
+        self._seats = {1: None, 2: None}
+        self._bot = bot
+        self._spectators = set()
+        self._lock = asyncio.Lock()
+        self._tasks = set()
+        self._active = time.monotonic()
+
+    def touch(self):
+        """
+        Marks the session as active just now
+        """
+        self._active = time.monotonic()
+
+    def idle_for(self):
+        """
+        Returns the seconds since the session was last active
+        """
+        return time.monotonic() - self._active
+
+    def seat(self, connection):
+        """
+        Takes connection, puts it in the first free seat and returns the
+        seat's player number, or returns None if both seats are taken
+        """
+        for player in (1, 2):
+            if self._seats[player] is None and not (player == 2 and self._bot):
+                self._seats[player] = connection
+                return player
+        return None
+
+    def player_of(self, connection):
+        """
+        Takes connection, returns the seat it is in, or None
+        """
+        for player in (1, 2):
+            if self._seats[player] is connection:
+                return player
+        return None
+
+    def watch(self, connection):
+        """
+        Takes connection, adds it to the spectators
+        """
+        self._spectators.add(connection)
+
+    def leave(self, connection):
+        """
+        Takes connection, takes it out of its seat or the spectators
+        """
+        player = self.player_of(connection)
+        if player is not None:
+            self._seats[player] = None
+        self._spectators.discard(connection)
+
+    def broadcast(self, message):
+        """
+        Takes a dictionary, sends it to both seats and every spectator
+        """
+        for connection in [self._seats[1], self._seats[2]] + list(self._spectators):
+            if connection is not None:
+                connection.send(message)
+
+    def start(self, coroutine):
+        """
+        Takes a coroutine, runs it as a task that the session keeps until it is
+        done, so it can't be garbage collected mid move. Anything it raises is
+        broadcast to the session as an error event
+        """
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self.finished)
+
+    def finished(self, task):
+        """
+        Takes a task the session started that is done, lets it go and
+        broadcasts the error it raised, if any
+        """
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.broadcast({'event': 'error', 'session': self._number, 'error': repr(task.exception())})
+
+    def close(self):
+        """
+        Cancels the tasks the session started that are still running
+        """
+        for task in list(self._tasks):
+            task.cancel()
+
+    def play(self, player, move):
+        """
+        Takes player and move, plays the move with move_pawn or place_fence and
+        returns what that returned: True, False, or 'breaks the fair play rule'
+        """
+        kind, position = move
+        if kind == 'p':
+            return self._game.move_pawn(player, position)
+        return self._game.place_fence(player, kind, position)
+
+    def bot_to_move(self):
+        """
+        Returns True if the game is still going and it is the bot's turn
+        """
+        return bool(self._bot) and self._game.get_winner() is None and self._game.get_turn() == 2
+
+    def state(self):
+        """
+        Returns a dictionary describing the session: its number, whose turn it
+        is, the winner (0 for none), the pawns, the fences each player has left,
+        and the moves so far in text notation
+        """
+        game = self._game
+        return {'session': self._number, 'turn': game.get_turn(), 'winner': game.get_winner() or 0,
+                'pawns': [game.get_pawn(1), game.get_pawn(2)],
+                'fences': [game.get_fences(1), game.get_fences(2)], 'moves': self._record.to_text()}
+
+    def get_number(self):
+        return self._number
+
+    def get_game(self):
+        return self._game
+
+    def get_bot(self):
+        return self._bot
+
+    def get_lock(self):
+        return self._lock
+
+
+class GameServer:
+    """
+    This represents the server: the sessions by number and the process pool for bot
+    moves. Each request is a JSON object with an 'op' and an optional 'id' that is
+    echoed in the reply. The ops are new (start a session, optionally against a bot,
+    and take seat 1), join (take the free seat, or watch if there isn't one), watch,
+    move (play a move in text notation, such as e2 or d5h), state, and leave. Every
+    move played is broadcast to the session as a 'move' event. Playing a human move
+    on a QuoridorGame takes microseconds, so it is done on the event loop, while bot
+    searches run in the process pool. Sessions left idle for idle_timeout seconds
+    are closed
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, bot_workers=None):
+        """
+        Takes the idle timeout in seconds and the number of bot worker processes
+        """
+        self._sessions = {}
+        self._next_number = 1
+        self._idle_timeout = idle_timeout
+        self._bot_workers = bot_workers
+        self._executor = None    # started when the first bot session is made
+        self._ops = {'new': self.op_new, 'join': self.op_join, 'watch': self.op_watch,
+                     'move': self.op_move, 'state': self.op_state, 'leave': self.op_leave}
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None):
+        """
+        Takes a host and port, or the path of a local socket, and serves
+        clients until cancelled
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        evictor = asyncio.ensure_future(self.evict_idle())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+            for session in self._sessions.values():
+                session.close()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        """
+        Takes the streams of a new client, answers its requests one line at a
+        time until it disconnects, then takes it out of its sessions. A client that
+        sends a line longer than the stream's limit is told so and disconnected
+        """
+        connection = Connection(writer)
+        try:
+            async for line in reader:
+                if line.strip():
+                    connection.send(await self.dispatch(connection, line))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except (asyncio.LimitOverrunError, ValueError):
+            connection.send({'ok': False, 'error': 'bad request: line too long'})
+        finally:
+            for number in list(connection.get_sessions()):
+                self.leave(connection, number)
+            writer.close()
+
+    async def dispatch(self, connection, line):
+        """
+        Takes the connection and one line it sent, returns the reply to send back
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {'ok': False, 'error': 'bad request: not JSON'}
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'bad request: not an object'}
+        try:
+            reply = await self._ops[request['op']](connection, request)
+        except (ValueError, KeyError, TypeError) as error:
+            reply = {'ok': False, 'error': 'bad request: %s' % error}
+        if 'id' in request:
+            reply['id'] = request['id']
+        return reply
+
+    def find(self, request):
+        """
+        Takes a request, returns the session it names and marks it
+        active, or raises KeyError if there is no such session
+        """
+        session = self._sessions.get(request.get('session'))
+        if session is None:
+            raise KeyError('no session %s' % request.get('session'))
+        session.touch()
+        return session
+
+    async def op_new(self, connection, request):
+        """
+        Starts a session with the connection in seat 1 and an optional bot in seat 2,
+        a tournament agent spec such as 'alphabeta/200'. Only the built in agents in
+        BOT_AGENTS can be asked for, so a client can't make the server import a module
+        """
+        bot = request.get('bot')
+        if bot:
+            check_bot(bot)
+            make_agent(bot)
+        number = self._next_number
+        self._next_number += 1
+        session = Session(number, bot)
+        self._sessions[number] = session
+        session.seat(connection)
+        connection.get_sessions().add(number)
+        return {'ok': True, 'session': number, 'player': 1}
+
+    async def op_join(self, connection, request):
+        """
+        Puts the connection in the session's free seat, or makes it a spectator if there isn't one
+        """
+        session = self.find(request)
+        player = session.seat(connection)
+        if player is None:
+            session.watch(connection)
+        connection.get_sessions().add(request['session'])
+        return {'ok': True, 'session': request['session'], 'player': player or 0}
+
+    async def op_watch(self, connection, request):
+        """
+        Makes the connection a spectator of the session
+        """
+        self.find(request).watch(connection)
+        connection.get_sessions().add(request['session'])
+        return {'ok': True, 'session': request['session']}
+
+    async def op_state(self, connection, request):
+        """
+        Returns the state of the session
+        """
+        return dict(self.find(request).state(), ok=True)
+
+    async def op_leave(self, connection, request):
+        """
+        Takes the connection out of the session
+        """
+        self.find(request)
+        self.leave(connection, request['session'])
+        return {'ok': True}
+
+    async def op_move(self, connection, request):
+        """
+        Plays the move for the connection's seat, broadcasts it, and
+        starts the bot's reply if the session has a bot
+        """
+        session = self.find(request)
+        move = from_notation(request['move'])
+        player = session.player_of(connection)
+        if player is None:
+            return {'ok': False, 'error': 'not seated in this session'}
+        async with session.get_lock():
+            result = self.apply(session, player, move)
+        if result is not True:
+            return {'ok': False, 'error': 'illegal move' if result is False else result}
+        if session.bot_to_move():
+            session.start(self.bot_turn(session))
+        return {'ok': True}
+
+    def apply(self, session, player, move):
+        """
+        Takes a session, player, and move, plays the move and broadcasts it if it
+        was legal, returns the result of Session.play
+        """
+        result = session.play(player, move)
+        if result is True:
+            session.broadcast({'event': 'move', 'session': session.get_number(), 'player': player,
+                               'move': to_notation(move), 'winner': session.get_game().get_winner() or 0})
+        return result
+
+    async def bot_turn(self, session):
+        """
+        Takes a session whose bot is to move, works out the bot's move in the process
+        pool and plays it. If the bot fails or its move is illegal, an error event
+        is broadcast to the session instead
+        """
+        async with session.get_lock():
+            if not session.bot_to_move():
+                return
+            try:
+                move = await self.pool_move(session)
+            except Exception as error:
+                session.broadcast({'event': 'error', 'session': session.get_number(),
+                                   'error': 'bot could not move: %s' % (error or type(error).__name__)})
+                return
+            if move is None or self.apply(session, 2, move) is not True:
+                session.broadcast({'event': 'error', 'session': session.get_number(),
+                                   'error': 'bot could not move'})
+
+    async def pool_move(self, session, attempts=BOT_ATTEMPTS):
+        """
+        Takes a session and the tries left, returns its bot's move worked out in the
+        process pool, starting the pool if needed. A pool whose worker process died is
+        shut down and the move is tried again on a new one, raising BrokenProcessPool
+        once there are no tries left
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._bot_workers)
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return await loop.run_in_executor(executor, bot_move, session.get_game().snapshot(), session.get_bot())
+        except BrokenProcessPool:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if self._executor is executor:
+                self._executor = None
+            if attempts <= 1:
+                raise
+        return await self.pool_move(session, attempts - 1)
+
+    def leave(self, connection, number):
+        """
+        Takes a connection and a session number, takes the connection out of the session
+        """
+        connection.get_sessions().discard(number)
+        if number in self._sessions:
+            self._sessions[number].leave(connection)
+
+    async def evict_idle(self):
+        """
+        Every EVICT_INTERVAL seconds closes the sessions that have been idle
+        for longer than the idle timeout, telling everyone in them and
+        cancelling the bot moves still being worked out
+        """
+        while True:
+            await asyncio.sleep(min(EVICT_INTERVAL, self._idle_timeout))
+            for number, session in list(self._sessions.items()):
+                if session.idle_for() > self._idle_timeout:
+                    session.broadcast({'event': 'evicted', 'session': number})
+                    session.close()
+                    del self._sessions[number]
+
+    def session_count(self):
+        """
+        Returns the number of open sessions
+        """
+        return len(self._sessions)
+
+
+_bot_agents = {}                 # agents made in this worker process, by spec
+
+
+def check_bot(spec):
+    """
+    Takes a bot agent spec from a client, raises ValueError unless it names an agent
+    in BOT_AGENTS with no option, or with a whole number option from 1 up to that
+    agent's limit, so one move can't tie up a bot worker for hours
+    """
+    name, slash, option = spec.partition('/') if isinstance(spec, str) else (None, '', '')
+    if name not in BOT_AGENTS:
+        raise ValueError('unknown bot: %s' % spec)
+    if slash and not (option.isdigit() and 1 <= int(option) <= BOT_AGENTS[name]):
+        raise ValueError('bot option must be from 1 to %d: %s' % (BOT_AGENTS[name], spec)
+                         if BOT_AGENTS[name] else '%s takes no option' % name)
+
+
+def bot_move(snapshot, spec):
+    """
+    Takes a game snapshot and an agent spec, runs in a bot worker process and
+    returns the agent's move. Each worker keeps one agent per spec, so search
+    trees and tables carry over between moves
+    """
+    if spec not in _bot_agents:
+        _bot_agents[spec] = make_agent(spec)
+    return _bot_agents[spec](QuoridorGame.from_snapshot(snapshot))
+
+
+class Client:
+    """
+    This represents a client connection used by the load generator. Requests are
+    sent one at a time, and event lines that arrive before the reply are skipped
+    """
+
+    def __init__(self, reader, writer):
+        """
+        Takes the streams of an open connection
+        """
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+
+    async def request(self, **request):
+        """
+        Takes the fields of a request, sends it, and returns the reply
+        """
+        self._next_id += 1
+        request['id'] = self._next_id
+        self._writer.write(json.dumps(request).encode() + b'\n')
+        await self._writer.drain()
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                raise ConnectionError('server closed the connection')
+            reply = json.loads(line)
+            if reply.get('id') == self._next_id:
+                return reply
+
+    def close(self):
+        self._writer.close()
+
+
+async def connect(host, port, path):
+    """
+    Takes a host and port, or the path of a local socket, returns a connected Client
+    """
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path, limit=1 << 20)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    return Client(reader, writer)
+
+
+async def play_session(host, port, path, max_plies):
+    """
+    Takes the server address and a ply limit, plays one game between two
+    connections using greedy moves and returns the latency of each move in
+    seconds
+    """
+    first = await connect(host, port, path)
+    second = await connect(host, port, path)
+    number = (await first.request(op='new'))['session']
+    await second.request(op='join', session=number)
+    game = QuoridorGame()
+    latencies = []
+    while game.get_winner() is None and len(latencies) < max_plies:
+        client = first if game.get_turn() == 1 else second
+        move = greedy_move(game)
+        start = time.perf_counter()
+        reply = await client.request(op='move', session=number, move=to_notation(move))
+        latencies.append(time.perf_counter() - start)
+        if not reply['ok']:
+            raise ValueError('server refused %s: %s' % (to_notation(move), reply['error']))
+        play_move(game, move)
+    first.close()
+    second.close()
+    return latencies
+
+
+async def load_test(sessions, host='127.0.0.1', port=8765, path=None, max_plies=100):
+    """
+    Takes a number of sessions, the server address, and a ply limit, plays that
+    many games at once and returns (moves, p50 ms, p99 ms, moves per second)
+    """
+    start = time.perf_counter()
+    results = await asyncio.gather(*[play_session(host, port, path, max_plies) for count in range(0, sessions)])
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for result in results for latency in result)
+    if not latencies:
+        return 0, 0.0, 0.0, 0.0
+    p50 = latencies[int(0.50 * (len(latencies) - 1))] * 1000
+    p99 = latencies[int(0.99 * (len(latencies) - 1))] * 1000
+    return len(latencies), p50, p99, len(latencies) / elapsed
+
+
+def main():
+    # python server.py serve --port 8765, then python server.py load --sessions 500
+    parser = argparse.ArgumentParser(description='Quoridor game server and load generator.')
+    parser.add_argument('command', choices=['serve', 'load'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help='path of a local socket to use instead of TCP')
+    parser.add_argument('--idle', type=float, default=IDLE_TIMEOUT, help='seconds before an idle session closes')
+    parser.add_argument('--bot-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--sessions', type=int, default=100, help='games the load generator plays at once')
+    args = parser.parse_args()
+    if args.command == 'serve':
+        try:
+            asyncio.run(GameServer(args.idle, args.bot_workers).serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+        return
+    moves, p50, p99, rate = asyncio.run(load_test(args.sessions, args.host, args.port, args.unix))
+    print(args.sessions, 'sessions,', moves, 'moves, p50 %.2f ms, p99 %.2f ms, %.0f moves/sec' % (p50, p99, rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Runs round-robin or gauntlet tournaments between Quoridor agents on a pool of worker processes.
+# Each finished game is appended to a JSON lines file right away, and the run ends with win rates, Elo
+# estimates, average game length, and games per second. Run with --help for the command line options.
+
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from Quoridor import QuoridorGame
+from mcts import MonteCarloSearcher
+from search import Searcher, tile
+
+MAX_ATTEMPTS = 3                  # times a game is retried after its worker process dies
+ELO_ROUNDS = 200
+
+
+class Tournament:
+    """
+    This represents a tournament between agents, given as agent specs (see make_agent).
+    In a round robin every agent plays every other agent, in a gauntlet the first agent
+    plays each of the others, and every pairing is played games times with each agent
+    going first. Games run on a process pool and every result is appended to the output
+    file as soon as it comes in. Games already in the file are not played again, so a
+    run that was stopped picks up where it left off: a game is known by its number, its
+    players, and the mode, so a run with other agents or another mode against the same
+    file plays its own games. If a worker process dies, the pool is restarted and the
+    games that were lost with it are played again
+    """
+
+    def __init__(self, agents, path, mode='round-robin', games=1, workers=None, max_plies=400, seed=0):
+        """
+        Takes the agent specs, the output file path, the mode ('round-robin' or
+        'gauntlet'), the games per pairing and side, the number of worker processes,
+        the most plies a game lasts before it is a draw, and the base random seed
+        """
+        self._agents = agents
+        self._path = path
+        self._mode = mode
+        self._games = games
+        self._workers = workers or os.cpu_count() or 1
+        self._max_plies = max_plies
+        self._seed = seed
+        self._results = []
+        self._attempts = {}
+
+    def schedule(self):
+        """
+        Returns the list of (player 1 spec, player 2 spec) games to play
+        """
+        if self._mode == 'gauntlet':
+            pairings = [(self._agents[0], other) for other in self._agents[1:]]
+        else:
+            pairings = [(self._agents[i], self._agents[j]) for i in range(0, len(self._agents))
+                        for j in range(i + 1, len(self._agents))]
+        games = []
+        for first, second in pairings:
+            for count in range(0, self._games):
+                games.extend([(first, second), (second, first)])
+        return games
+
+    def run(self):
+        """
+        Plays every game that isn't in the output file yet, returns
+        the number of games played and the seconds it took
+        """
+        done = self.load()
+        pending = {number: players for number, players in enumerate(self.schedule())
+                   if (number, players[0], players[1], self._mode) not in done}
+        played = len(pending)
+        start = time.perf_counter()
+        with open(self._path, 'a') as out:
+            while pending:
+                self.run_pool(pending, out)
+        return played, time.perf_counter() - start
+
+    def load(self):
+        """
+        Reads the results already in the output file, returns the set of
+        (game number, player 1 spec, player 2 spec, mode) of the games in it
+        """
+        if not os.path.exists(self._path):
+            return set()
+        with open(self._path) as results:
+            for line in results:
+                if line.strip():
+                    self._results.append(json.loads(line))
+        return {(result['game'], result['p1'], result['p2'], result.get('mode')) for result in self._results}
+
+    def run_pool(self, pending, out):
+        """
+        Takes the pending games by number and the open output file, plays them on a
+        new process pool and records each as it finishes, removing it from pending.
+        Only one game per worker is handed out at a time, so if a worker dies and the
+        pool breaks, just the games that were being played are lost. Those stay
+        pending to be played again on the next pool
+        """
+        queue = list(pending.items())
+        running = {}
+        with ProcessPoolExecutor(self._workers) as pool:
+            while queue or running:
+                while queue and len(running) < self._workers:
+                    number, (first, second) = queue.pop()
+                    future = pool.submit(play_game, number, first, second, self._seed + number, self._max_plies)
+                    running[future] = number
+                finished = wait(running, return_when=FIRST_COMPLETED)[0]
+                if not self.collect(finished, running, pending, out):
+                    return
+
+    def collect(self, finished, running, pending, out):
+        """
+        Takes the finished futures, the running futures by game number, the pending
+        games, and the output file, records the finished games and returns True, or
+        if the pool has broken, keeps what it can of the running games and returns False
+        """
+        for future in finished:
+            try:
+                self.record(future.result(), out)
+                del pending[running.pop(future)]
+            except BrokenProcessPool:
+                self.salvage(running, pending, out)
+                return False
+        return True
+
+    def salvage(self, running, pending, out):
+        """
+        Takes the running futures by game number from a broken pool, the pending games,
+        and the output file, records the games that finished before the pool broke and
+        counts the rest as lost
+        """
+        for future, number in running.items():
+            if future.done() and future.exception() is None:
+                self.record(future.result(), out)
+                del pending[number]
+            else:
+                self.lost(number, pending, out)
+
+    def lost(self, number, pending, out):
+        """
+        Takes the number of a game lost to a dead worker process, the pending games,
+        and the output file, records the game as a crash once it has been lost
+        MAX_ATTEMPTS times, otherwise leaves it pending
+        """
+        self._attempts[number] = self._attempts.get(number, 0) + 1
+        if self._attempts[number] >= MAX_ATTEMPTS:
+            first, second = pending.pop(number)
+            self.record({'game': number, 'p1': first, 'p2': second, 'winner': None,
+                         'plies': 0, 'seconds': 0.0, 'end': 'crash'}, out)
+
+    def record(self, result, out):
+        """
+        Takes a game result and the output file, writes the result with the
+        tournament's mode to the file as one line of JSON and keeps it for the report
+        """
+        result['mode'] = self._mode
+        out.write(json.dumps(result) + '\n')
+        out.flush()
+        self._results.append(result)
+
+    def get_results(self):
+        """
+        Returns the results of every game, including those read from the output file
+        """
+        return self._results
+
+
+def make_agent(spec, seed=0):
+    """
+    Takes an agent spec and a random seed, returns the agent: a function that takes a
+    game and returns a move for whoever's turn it is. The specs are 'random' (any legal
+    move), 'greedy' (the step that shortens its own path most), 'alphabeta/ms' (alpha-
+    beta search for ms milliseconds, 100 by default, playing from the opening book in
+    book.BOOK_PATH when there is one), 'mcts/n' (n Monte Carlo iterations,
+    200 by default), and 'module:name' for a function of your own
+    """
+    name, slash, option = spec.partition('/')
+    if name == 'random':
+        rng = random.Random(seed)
+        return lambda game: rng.choice(game.legal_moves())
+    if name == 'greedy':
+        return greedy_move
+    if name == 'alphabeta':
+        searcher = Searcher(1 << 16)
+        time_ms = int(option) if option else 100
+        return lambda game: searcher.search(game, time_ms).move
+    if name == 'mcts':
+        searcher = MonteCarloSearcher(seed=seed)
+        iterations = int(option) if option else 200
+        return lambda game: searcher.search(game, iterations).move
+    if ':' in name:
+        module, attribute = name.split(':', 1)
+        return getattr(importlib.import_module(module), attribute)
+    raise ValueError('unknown agent: ' + spec)
+
+
+def greedy_move(game):
+    """
+    Takes game, returns the pawn move that brings whoever's turn it is closest to
+    their goal row, or a legal fence if the pawn can't move at all
+    """
+    turn = game.get_turn()
+    moves = game.legal_pawn_moves()
+    if not moves:
+        fences = game.legal_fences()
+        return fences[0] if fences else None
+    distances = game.distance_map(turn)
+    return 'p', min(moves, key=lambda position: distances[tile(position, game.get_size())])
+
+
+def play_game(number, first, second, seed, max_plies):
+    """
+    Takes the game number, the specs of player 1 and player 2, a random seed, and the
+    ply limit, plays the game in a worker process and returns its result. A player whose
+    agent raises an error or returns an illegal move loses the game
+    """
+    start = time.perf_counter()
+    game = QuoridorGame()
+    agents = {1: make_agent(first, seed), 2: make_agent(second, seed + 1)}
+    result = {'game': number, 'p1': first, 'p2': second, 'winner': 0, 'plies': 0, 'end': 'limit'}
+    while game.get_winner() is None and result['plies'] < max_plies:
+        turn = game.get_turn()
+        try:
+            legal = play(game, turn, agents[turn](game))
+        except Exception as error:
+            legal = False
+            result['error'] = repr(error)
+        if not legal:
+            result.update(winner=3 - turn, end='forfeit')
+            break
+        result['plies'] += 1
+    if game.get_winner() is not None:
+        result.update(winner=game.get_winner(), end='goal')
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def play(game, turn, move):
+    """
+    Takes game, turn, and a move from an agent, plays the move through move_pawn
+    or place_fence and returns True if it was legal, otherwise False
+    """
+    if not isinstance(move, tuple) or len(move) != 2:
+        return False
+    if move[0] == 'p':
+        return game.move_pawn(turn, move[1])
+    return game.place_fence(turn, move[0], move[1]) is True
+
+
+def standings(results, agents):
+    """
+    Takes the game results and the agent specs, returns a list of (spec, games, wins,
+    losses, draws, win rate, Elo) for every agent, best Elo first. Games lost to a
+    crash or played by agents that aren't in the list are left out, and draws count
+    as half a win
+    """
+    finished = [result for result in results if result['winner'] is not None
+                and result['p1'] in agents and result['p2'] in agents]
+    ratings = elo_ratings(finished, agents)
+    rows = []
+    for agent in agents:
+        games = [result for result in finished if agent in (result['p1'], result['p2'])]
+        wins = sum(1 for result in games if result['winner'] and result['p%d' % result['winner']] == agent)
+        draws = sum(1 for result in games if result['winner'] == 0)
+        losses = len(games) - wins - draws
+        rate = (wins + draws / 2) / len(games) if games else 0.0
+        rows.append((agent, len(games), wins, losses, draws, rate, ratings[agent]))
+    return sorted(rows, key=lambda row: -row[6])
+
+
+def elo_ratings(results, agents):
+    """
+    Takes the game results and the agent specs, returns a dictionary of Elo ratings
+    (averaging 0) fitted to every game at once with the Bradley-Terry model. Each
+    pair of agents starts with one drawn game between them so that an agent that
+    won or lost everything still gets a finite rating. Games played by agents that
+    aren't in the list are left out
+    """
+    scores = {agent: 0.0 for agent in agents}
+    meetings = {}
+    for i, agent in enumerate(agents):
+        for other in agents[i + 1:]:
+            add_game(scores, meetings, agent, other, 0.5)
+    for result in results:
+        if result['p1'] != result['p2'] and result['p1'] in scores and result['p2'] in scores:
+            share = {1: 1.0, 2: 0.0}.get(result['winner'], 0.5)
+            add_game(scores, meetings, result['p1'], result['p2'], share)
+    strengths = {agent: 1.0 for agent in agents}
+    for count in range(0, ELO_ROUNDS):
+        for agent in agents:
+            total = sum(games / (strengths[agent] + strengths[other])
+                        for (first, other), games in meetings.items() if first == agent)
+            strengths[agent] = scores[agent] / total if total else 1.0
+    mean = sum(math.log10(strength) for strength in strengths.values()) / len(agents)
+    return {agent: 400 * (math.log10(strength) - mean) for agent, strength in strengths.items()}
+
+
+def add_game(scores, meetings, first, second, share):
+    """
+    Takes the scores, the games played between each pair, two agents, and the share
+    of the point the first agent got, adds the game to scores and meetings
+    """
+    scores[first] += share
+    scores[second] += 1 - share
+    meetings[first, second] = meetings.get((first, second), 0) + 1
+    meetings[second, first] = meetings.get((second, first), 0) + 1
+
+
+def report(tournament, agents, played, seconds):
+    """
+    Takes the tournament, the agent specs, the games played in this run and the
+    seconds they took, prints the standings, average game length, and games per second
+    over the games between those agents
+    """
+    results = [result for result in tournament.get_results() if result['p1'] in agents and result['p2'] in agents]
+    print('%-24s %6s %6s %6s %6s %7s %7s' % ('agent', 'games', 'wins', 'losses', 'draws', 'score', 'elo'))
+    for agent, games, wins, losses, draws, rate, elo in standings(results, agents):
+        print('%-24s %6d %6d %6d %6d %6.1f%% %+7.0f' % (agent, games, wins, losses, draws, 100 * rate, elo))
+    lengths = [result['plies'] for result in results if result['winner'] is not None]
+    crashes = len(results) - len(lengths)
+    print('average game length:', round(sum(lengths) / len(lengths), 1) if lengths else 0, 'plies')
+    print('games played:', played, 'in', round(seconds, 1), 'sec,',
+          round(played / seconds, 2) if seconds > 0 else 0, 'games/sec')
+    if crashes:
+        print('games lost to crashed workers:', crashes)
+
+
+def main():
+    # runs a tournament from the command line, for example
+    # python tournament.py random greedy alphabeta/50 mcts/300 --games 10
+    parser = argparse.ArgumentParser(description='Play Quoridor agents against each other.')
+    parser.add_argument('agents', nargs='+', help="agent specs: random, greedy, alphabeta/ms, mcts/n, module:name")
+    parser.add_argument('--mode', choices=['round-robin', 'gauntlet'], default='round-robin')
+    parser.add_argument('--games', type=int, default=1, help='games per pairing with each agent going first')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--max-plies', type=int, default=400, help='plies before a game is a draw')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='tournament.jsonl', help='JSON lines file for the results')
+    args = parser.parse_args()
+    if len(args.agents) < 2:
+        parser.error('at least two agents are needed')
+    for spec in args.agents:
+        make_agent(spec)
+    tournament = Tournament(args.agents, args.out, args.mode, args.games, args.workers, args.max_plies, args.seed)
+    played, seconds = tournament.run()
+    report(tournament, args.agents, played, seconds)
+
+
+if __name__ == '__main__':
+    main()
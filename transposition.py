@@ -0,0 +1,90 @@
+# Author: Matt Gader
+# Date: 10/18/2026
+# Description: Bounded transposition table keyed by the Zobrist hash from QuoridorGame.zobrist_hash, used
+# to cache search results (and any other per-position answer) for positions reached by different move orders.
+
+EXACT = 0       # stored score is the exact value of the position
+LOWER = 1       # stored score is a lower bound (search failed high)
+UPPER = 2       # stored score is an upper bound (search failed low)
+
+
+class TranspositionTable:
+    """
+    This represents a fixed size table of position entries keyed by Zobrist hash. The
+    table is split into buckets of two slots. The first slot keeps the entry searched
+    to the greatest depth (depth-preferred) and the second slot always takes the newest
+    entry (always-replace), so deep results survive while recent ones are still cached.
+    Entries left over from an earlier search can be replaced whatever their depth once
+    new_search has been called. Each entry is a tuple of (key, depth, value, flag, move, age)
+    """
+
+    def __init__(self, size=1 << 16):
+        """
+        Takes size, the number of buckets (rounded down to a power of two),
+        and initializes the empty table and its hit and miss counters
+        """
+        buckets = 1
+        while buckets * 2 <= size:
+            buckets *= 2
+        self._mask = buckets - 1
+        self._slots = [None] * (buckets * 2)
+        self._age = 0
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+
+    def __len__(self):
+        """
+        Returns the number of entries in the table
+        """
+        return len(self._slots) - self._slots.count(None)
+
+    def new_search(self):
+        """
+        Starts a new search, letting entries stored before now be
+        replaced by shallower ones
+        """
+        self._age += 1
+
+    def clear(self):
+        """
+        Removes every entry from the table
+        """
+        self._slots = [None] * len(self._slots)
+
+    def probe(self, key):
+        """
+        Takes key, returns a tuple of (depth, value, flag, move) for the
+        position with that hash, or None if it isn't in the table
+        """
+        index = (key & self._mask) * 2
+        for entry in (self._slots[index], self._slots[index + 1]):
+            if entry is not None and entry[0] == key:
+                self._hits += 1
+                return entry[1:5]
+        self._misses += 1
+        return None
+
+    def store(self, key, depth, value, flag=EXACT, move=None):
+        """
+        Takes key, depth, value, flag, and move, stores the entry in the key's bucket.
+        It goes in the depth-preferred slot if that slot is empty, holds the same
+        position, is from an older search, or was searched no deeper, otherwise it
+        goes in the always-replace slot
+        """
+        index = (key & self._mask) * 2
+        entry = (key, depth, value, flag, move, self._age)
+        deep = self._slots[index]
+        self._stores += 1
+        if deep is None or deep[0] == key or deep[5] != self._age or depth >= deep[1]:
+            self._slots[index] = entry
+        else:
+            self._slots[index + 1] = entry
+
+    def stats(self):
+        """
+        Returns a dictionary with the number of hits, misses, and stores
+        since the table was created, and the number of entries held
+        """
+        return {'hits': self._hits, 'misses': self._misses, 'stores': self._stores,
+                'entries': len(self), 'capacity': len(self._slots)}